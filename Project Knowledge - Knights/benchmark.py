@@ -0,0 +1,141 @@
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from logic import *
+
+# Largest number of symbols each engine is benchmarked on
+ENGINE_LIMITS = {
+    "enumerate": 40,
+    "compiled": COMPILED_MAX_SYMBOLS,
+    "sat": 2000,
+    "parallel": 40,
+}
+
+
+def main():
+    if len(sys.argv) > 4:
+        sys.exit("Usage: python benchmark.py [characters] [statements] "
+                 "[output]")
+    characters = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    statements = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    output = sys.argv[3] if len(sys.argv) == 4 else None
+
+    # Double the number of characters up to the limit, with the given
+    # number of statements, or by default twice as many as characters
+    results = []
+    n = 2
+    while n <= characters:
+        count = 2 * n if statements is None else statements
+        results.extend(benchmark(n, count))
+        n *= 2
+
+    report = json.dumps(results, indent=4)
+    if output is None:
+        print(report)
+    else:
+        with open(output, "w") as f:
+            f.write(report)
+
+
+def generate(characters, statements, seed=0):
+    """
+    Generates a knights and knaves puzzle with the given number of
+    characters and statements, returning its knowledge base and the list
+    of symbols to query. Statements are chosen to agree with a hidden
+    solution, so the knowledge base is always consistent.
+    """
+    rng = random.Random(seed)
+    knights = [Symbol(f"{i} is a Knight") for i in range(characters)]
+    knaves = [Symbol(f"{i} is a Knave") for i in range(characters)]
+    solution = dict()
+    for knight, knave in zip(knights, knaves):
+        solution[knight.name] = rng.random() < 0.5
+        solution[knave.name] = not solution[knight.name]
+
+    # Each character is either a knight or a knave, but not both
+    knowledge = And()
+    for knight, knave in zip(knights, knaves):
+        knowledge.add(Or(knight, knave))
+        knowledge.add(Not(And(knight, knave)))
+
+    # Each statement is true if spoken by a knight, and false otherwise
+    for _ in range(statements):
+        speaker = rng.randrange(characters)
+        claim = statement(rng, knights, knaves)
+        if claim.evaluate(solution) != solution[knights[speaker].name]:
+            claim = Not(claim)
+        knowledge.add(Implication(knights[speaker], claim))
+        knowledge.add(Implication(knaves[speaker], Not(claim)))
+
+    return knowledge, knights + knaves
+
+
+def statement(rng, knights, knaves):
+    """Returns a random claim about the kinds of up to three characters."""
+    claims = []
+    for _ in range(rng.randint(1, 3)):
+        i = rng.randrange(len(knights))
+        claims.append(knights[i] if rng.random() < 0.5 else knaves[i])
+    if len(claims) == 1:
+        return claims[0]
+    return And(*claims) if rng.random() < 0.5 else Or(*claims)
+
+
+def benchmark(characters, statements, seed=0):
+    """
+    Asks every engine which symbols a generated puzzle entails, returning
+    one record per engine with the wall time, nodes explored and peak
+    memory allocated by this process.
+
+    Time is measured in a pass without tracing memory, which slows some
+    engines far more than others, and peak memory in a second, traced
+    pass. The parallel engine starts a pool of processes for every query,
+    which its time includes and its peak memory, traced only in this
+    process, leaves out; its records say so.
+    """
+    knowledge, queries = generate(characters, statements, seed)
+    symbols = len(queries)
+    results = []
+    answers = None
+    for engine in ENGINES:
+        if symbols > ENGINE_LIMITS.get(engine, symbols):
+            continue
+        nodes = 0
+        start = time.perf_counter()
+        entailed = []
+        for query in queries:
+            stats = dict()
+            entailed.append(model_check(knowledge, query, engine, stats))
+            nodes += stats.get("nodes", 0)
+        seconds = time.perf_counter() - start
+
+        tracemalloc.start()
+        for query in queries:
+            model_check(knowledge, query, engine)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Every engine must agree with the first one
+        if answers is None:
+            answers = entailed
+        results.append({
+            "characters": characters,
+            "statements": statements,
+            "symbols": symbols,
+            "engine": engine,
+            "seconds": seconds,
+            "nodes": nodes,
+            "peak_bytes": peak,
+            "entailed": sum(entailed),
+            "agrees": entailed == answers,
+            "includes_pool_startup": engine == "parallel",
+            "peak_bytes_excludes_workers": engine == "parallel",
+        })
+    return results
+
+
+if __name__ == "__main__":
+    main()
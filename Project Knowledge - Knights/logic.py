@@ -1,12 +1,62 @@
+import contextlib
+import heapq
 import itertools
+import multiprocessing
+import os
+import re
+import weakref
 
+from array import array
 
-class Sentence():
+
+class SentenceType(type):
+    """
+    Type of logical sentences: while interning is enabled, constructing a
+    sentence returns the interned instance with the same structure.
+    """
+
+    def __call__(cls, *args, **kwargs):
+        sentence = super().__call__(*args, **kwargs)
+        if interning_depth:
+            return intern(sentence)
+        return sentence
+
+
+class Sentence(metaclass=SentenceType):
+
+    # Interned sentences cache their hash and symbols; others leave None
+    __slots__ = ("_hash", "_symbols", "__weakref__")
+
+    def __init__(self):
+        self._hash = None
+        self._symbols = None
+
+    def __reduce__(self):
+        # Copies are rebuilt from operands and never share interned caches
+        if isinstance(self, Symbol):
+            return Symbol, (self.name,)
+        return type(self), tuple(Circuit.operation(self)[1])
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def evaluate_partial(self, model):
+        """
+        Evaluates the logical sentence under a partial model, returning
+        True or False if every completion of the model agrees, and None
+        if the value is still unknown.
+        """
+        raise Exception("nothing to evaluate")
+
+    def condition(self, model):
+        """
+        Returns the sentence simplified under a partial model: True or False
+        if the model already decides it, otherwise an equivalent sentence
+        over the symbols the model leaves unassigned.
+        """
+        raise Exception("nothing to condition")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
@@ -15,6 +65,16 @@ class Sentence():
         """Returns a set of all symbols in the logical sentence."""
         return set()
 
+    def interned(self):
+        """Checks if the sentence is an interned, immutable instance."""
+        return self._hash is not None
+
+    @classmethod
+    def interned_pair(cls, a, b):
+        """Checks if both sentences are interned, so equal only if same."""
+        return (a._hash is not None and isinstance(b, Sentence)
+                and b._hash is not None)
+
     @classmethod
     def validate(cls, sentence):
         if not isinstance(sentence, Sentence):
@@ -43,14 +103,20 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
     def __init__(self, name):
+        super().__init__()
         self.name = name
 
     def __eq__(self, other):
+        if Sentence.interned_pair(self, other):
+            return self is other
         return isinstance(other, Symbol) and self.name == other.name
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("symbol", self.name))
 
     def __repr__(self):
@@ -62,22 +128,42 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def evaluate_partial(self, model):
+        value = model.get(self.name)
+        if value is None:
+            return None
+        return bool(value)
+
+    def condition(self, model):
+        if self.name in model:
+            return bool(model[self.name])
+        return self
+
     def formula(self):
         return self.name
 
     def symbols(self):
+        if self._symbols is not None:
+            return self._symbols
         return {self.name}
 
 
 class Not(Sentence):
+    __slots__ = ("operand",)
+
     def __init__(self, operand):
+        super().__init__()
         Sentence.validate(operand)
         self.operand = operand
 
     def __eq__(self, other):
+        if Sentence.interned_pair(self, other):
+            return self is other
         return isinstance(other, Not) and self.operand == other.operand
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("not", hash(self.operand)))
 
     def __repr__(self):
@@ -86,23 +172,48 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def evaluate_partial(self, model):
+        value = self.operand.evaluate_partial(model)
+        if value is None:
+            return None
+        return not value
+
+    def condition(self, model):
+        operand = self.operand.condition(model)
+        if isinstance(operand, bool):
+            return not operand
+        if operand is self.operand:
+            return self
+        return Not(operand)
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
     def symbols(self):
+        if self._symbols is not None:
+            return self._symbols
         return self.operand.symbols()
 
 
 class And(Sentence):
+    __slots__ = ("conjuncts",)
+
     def __init__(self, *conjuncts):
+        super().__init__()
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        if Sentence.interned_pair(self, other):
+            return self is other
+        return isinstance(other, And) and (
+            list(self.conjuncts) == list(other.conjuncts)
+        )
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(
             ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
         )
@@ -114,32 +225,77 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
+        if self._hash is not None:
+            raise TypeError("interned sentences cannot be changed")
         Sentence.validate(conjunct)
         self.conjuncts.append(conjunct)
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def evaluate_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
+    def condition(self, model):
+        conjuncts = []
+        for conjunct in self.conjuncts:
+            value = conjunct.condition(model)
+            if value is False:
+                return False
+            if value is not True:
+                conjuncts.append(value)
+        if not conjuncts:
+            return True
+        if len(conjuncts) == 1:
+            return conjuncts[0]
+        if len(conjuncts) == len(self.conjuncts) and all(
+            a is b for a, b in zip(conjuncts, self.conjuncts)
+        ):
+            return self
+        return And(*conjuncts)
+
     def formula(self):
+        if not self.conjuncts:
+            return "⊤"
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        if self._symbols is not None:
+            return self._symbols
+        return set().union(
+            *[conjunct.symbols() for conjunct in self.conjuncts]
+        )
 
 
 class Or(Sentence):
+    __slots__ = ("disjuncts",)
+
     def __init__(self, *disjuncts):
+        super().__init__()
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
         self.disjuncts = list(disjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        if Sentence.interned_pair(self, other):
+            return self is other
+        return isinstance(other, Or) and (
+            list(self.disjuncts) == list(other.disjuncts)
+        )
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(
             ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
         )
@@ -151,29 +307,70 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def evaluate_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.evaluate_partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
+    def condition(self, model):
+        disjuncts = []
+        for disjunct in self.disjuncts:
+            value = disjunct.condition(model)
+            if value is True:
+                return True
+            if value is not False:
+                disjuncts.append(value)
+        if not disjuncts:
+            return False
+        if len(disjuncts) == 1:
+            return disjuncts[0]
+        if len(disjuncts) == len(self.disjuncts) and all(
+            a is b for a, b in zip(disjuncts, self.disjuncts)
+        ):
+            return self
+        return Or(*disjuncts)
+
     def formula(self):
+        if not self.disjuncts:
+            return "⊥"
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        if self._symbols is not None:
+            return self._symbols
+        return set().union(
+            *[disjunct.symbols() for disjunct in self.disjuncts]
+        )
 
 
 class Implication(Sentence):
+    __slots__ = ("antecedent", "consequent")
+
     def __init__(self, antecedent, consequent):
+        super().__init__()
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
         self.antecedent = antecedent
         self.consequent = consequent
 
     def __eq__(self, other):
+        if Sentence.interned_pair(self, other):
+            return self is other
         return (isinstance(other, Implication)
                 and self.antecedent == other.antecedent
                 and self.consequent == other.consequent)
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("implies", hash(self.antecedent), hash(self.consequent)))
 
     def __repr__(self):
@@ -183,28 +380,63 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def evaluate_partial(self, model):
+        antecedent = self.antecedent.evaluate_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.evaluate_partial(model)
+        if consequent is True:
+            return True
+        if antecedent is None or consequent is None:
+            return None
+        return False
+
+    def condition(self, model):
+        antecedent = self.antecedent.condition(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.condition(model)
+        if consequent is True or antecedent is True:
+            return consequent
+        if consequent is False:
+            return Not(antecedent)
+        if (antecedent is self.antecedent
+                and consequent is self.consequent):
+            return self
+        return Implication(antecedent, consequent)
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
     def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+        if self._symbols is not None:
+            return self._symbols
+        return set().union(self.antecedent.symbols(),
+                           self.consequent.symbols())
 
 
 class Biconditional(Sentence):
+    __slots__ = ("left", "right")
+
     def __init__(self, left, right):
+        super().__init__()
         Sentence.validate(left)
         Sentence.validate(right)
         self.left = left
         self.right = right
 
     def __eq__(self, other):
+        if Sentence.interned_pair(self, other):
+            return self is other
         return (isinstance(other, Biconditional)
                 and self.left == other.left
                 and self.right == other.right)
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("biconditional", hash(self.left), hash(self.right)))
 
     def __repr__(self):
@@ -216,48 +448,1419 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def evaluate_partial(self, model):
+        left = self.left.evaluate_partial(model)
+        if left is None:
+            return None
+        right = self.right.evaluate_partial(model)
+        if right is None:
+            return None
+        return left == right
+
+    def condition(self, model):
+        left = self.left.condition(model)
+        right = self.right.condition(model)
+        if isinstance(left, bool):
+            if isinstance(right, bool):
+                return left == right
+            return right if left else Not(right)
+        if isinstance(right, bool):
+            return left if right else Not(left)
+        if left is self.left and right is self.right:
+            return self
+        return Biconditional(left, right)
+
     def formula(self):
-        left = Sentence.parenthesize(str(self.left))
-        right = Sentence.parenthesize(str(self.right))
+        left = Sentence.parenthesize(self.left.formula())
+        right = Sentence.parenthesize(self.right.formula())
         return f"{left} <=> {right}"
 
     def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
-
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
+        if self._symbols is not None:
+            return self._symbols
+        return set().union(self.left.symbols(), self.right.symbols())
+
+
+# Interned sentences, keyed by type and operands, while they are in use
+interned_sentences = weakref.WeakValueDictionary()
+
+# Number of active interning blocks
+interning_depth = 0
+
+
+@contextlib.contextmanager
+def interning():
+    """
+    Within the block, constructing a sentence returns the interned instance
+    with the same structure, so equal sentences are the same object.
+    """
+    global interning_depth
+    interning_depth += 1
+    try:
+        yield
+    finally:
+        interning_depth -= 1
+
+
+def intern(sentence):
+    """
+    Returns the interned instance of a sentence: an immutable sentence built
+    from interned operands, with its hash and symbols computed once.
+    Structurally equal sentences intern to the same object.
+    """
+    if sentence._hash is not None:
+        return sentence
+    if isinstance(sentence, Symbol):
+        operands = (sentence.name,)
+        key = (Symbol, sentence.name)
+    else:
+        operands = tuple(
+            intern(operand) for operand in Circuit.operation(sentence)[1]
+        )
+        key = (type(sentence),) + tuple(id(operand) for operand in operands)
+    interned = interned_sentences.get(key)
+    if interned is None:
+        interned = type.__call__(type(sentence), *operands)
+
+        # Operand lists become tuples, so interned sentences cannot change
+        if isinstance(interned, And):
+            interned.conjuncts = tuple(interned.conjuncts)
+        elif isinstance(interned, Or):
+            interned.disjuncts = tuple(interned.disjuncts)
+        interned._symbols = frozenset(interned.symbols())
+        interned._hash = hash(interned)
+        interned_sentences[key] = interned
+    return interned
+
+
+class Circuit():
+    """
+    Flat, array-backed form of one or more logical sentences.
+
+    Every distinct subformula is stored once as a node, and nodes are kept
+    in topological order (operands before the sentences using them), so a
+    whole sentence can be processed with one loop instead of recursive
+    method calls.
+    """
+
+    SYMBOL, NOT, AND, OR, IMPLICATION, BICONDITIONAL = range(6)
+
+    # Binary connectives of formulas, with their operation and precedence
+    CONNECTIVES = {
+        "∧": (AND, 4),
+        "∨": (OR, 3),
+        "=>": (IMPLICATION, 2),
+        "<=>": (BICONDITIONAL, 1),
+    }
+    PRECEDENCE = {NOT: 5, AND: 4, OR: 3, IMPLICATION: 2, BICONDITIONAL: 1}
+
+    # Connectives, constants and parentheses; symbol names; anything else
+    TOKENS = re.compile(r"\s*(?:(<=>|=>|[¬∧∨()⊤⊥])|([^¬∧∨()⊤⊥<=>]+)|(.))")
+
+    def __init__(self):
+
+        # Symbol names, indexed by variable number
+        self.names = []
+        self.variables = dict()
+
+        # Operation of each node; the operands of node k are
+        # operands[offsets[k]:offsets[k + 1]] (a variable for symbols)
+        self.ops = array("b")
+        self.offsets = array("q", [0])
+        self.operands = array("q")
+
+        # Maps (operation, operands) to the node computing it
+        self.nodes = dict()
+
+        # Truth tables of the symbols, for the current number of symbols
+        self.masks = []
+
+    def __len__(self):
+        return len(self.ops)
+
+    def node(self, op, operands):
+        """Returns the node applying op to operands, adding it if new."""
+        key = (op, tuple(operands))
+        node = self.nodes.get(key)
+        if node is None:
+            node = len(self.ops)
+            self.ops.append(op)
+            self.operands.extend(key[1])
+            self.offsets.append(len(self.operands))
+            self.nodes[key] = node
+        return node
+
+    def symbol(self, name):
+        """Returns the node for the symbol with the given name."""
+        variable = self.variables.get(name)
+        if variable is None:
+            variable = len(self.names)
+            self.names.append(name)
+            self.variables[name] = variable
+        return self.node(Circuit.SYMBOL, (variable,))
+
+    def children(self, node):
+        """Returns the operands of a node."""
+        return self.operands[self.offsets[node]:self.offsets[node + 1]]
+
+    def add(self, sentence):
+        """Adds a logical sentence to the circuit and returns its node."""
+        Sentence.validate(sentence)
+        compiled = dict()
+        stack = [(sentence, False)]
+        while stack:
+            current, expanded = stack.pop()
+            if id(current) in compiled:
+                continue
+            if isinstance(current, Symbol):
+                compiled[id(current)] = self.symbol(current.name)
+                continue
+            op, operands = Circuit.operation(current)
+            if expanded:
+                compiled[id(current)] = self.node(
+                    op, [compiled[id(operand)] for operand in operands]
+                )
+            else:
+                stack.append((current, True))
+                stack.extend((operand, False) for operand in operands
+                             if id(operand) not in compiled)
+        return compiled[id(sentence)]
 
-        # If model has an assignment for each symbol
-        if not symbols:
+    @classmethod
+    def operation(cls, sentence):
+        """Returns the operation and operands of a compound sentence."""
+        if isinstance(sentence, Not):
+            return cls.NOT, [sentence.operand]
+        elif isinstance(sentence, And):
+            return cls.AND, sentence.conjuncts
+        elif isinstance(sentence, Or):
+            return cls.OR, sentence.disjuncts
+        elif isinstance(sentence, Implication):
+            return cls.IMPLICATION, [sentence.antecedent, sentence.consequent]
+        elif isinstance(sentence, Biconditional):
+            return cls.BICONDITIONAL, [sentence.left, sentence.right]
+        raise TypeError(f"cannot compile {type(sentence).__name__}")
+
+    def parse(self, text):
+        """
+        Parses a formula written as Sentence.formula prints it, with the
+        connectives ¬, ∧, ∨, =>, <=> and the constants ⊤ and ⊥, and adds
+        it to the circuit, returning its node.
+
+        Symbol names are the text between connectives and parentheses, so
+        they may contain spaces but none of the characters ¬∧∨()⊤⊥<=>.
+        The parser keeps explicit stacks instead of recursing, so there is
+        no limit on how deeply formulas are nested.
+        """
+        operands = []
+        operators = []
+        expect_operand = True
+        for match in Circuit.TOKENS.finditer(text):
+            token, name, invalid = match.groups()
+            if invalid is not None:
+                raise ValueError(f"unexpected {invalid!r} in formula")
+            if name is not None:
+                name = name.strip()
+                if not name:
+                    continue
+                token = "name"
+            if expect_operand:
+                if token == "name":
+                    operands.append(self.symbol(name))
+                    expect_operand = False
+                elif token in ("⊤", "⊥"):
+                    op = Circuit.AND if token == "⊤" else Circuit.OR
+                    operands.append(self.node(op, ()))
+                    expect_operand = False
+                elif token == "¬":
+                    operators.append([Circuit.NOT, 1])
+                elif token == "(":
+                    operators.append([None, 0])
+                else:
+                    raise ValueError(f"expected operand before {token!r}")
+            elif token == ")":
+                while operators and operators[-1][0] is not None:
+                    self.reduce(operators, operands)
+                if not operators:
+                    raise ValueError("unbalanced parentheses in formula")
+                operators.pop()
+            elif token in Circuit.CONNECTIVES:
+                op, precedence = Circuit.CONNECTIVES[token]
+                merged = False
+                while operators and operators[-1][0] is not None:
+                    top = operators[-1][0]
+                    if Circuit.PRECEDENCE[top] < precedence:
+                        break
+                    if Circuit.PRECEDENCE[top] == precedence:
+
+                        # Chains of ∧ or ∨ form one node, => groups right
+                        if op in (Circuit.AND, Circuit.OR):
+                            operators[-1][1] += 1
+                            merged = True
+                            break
+                        if op == Circuit.IMPLICATION:
+                            break
+                    self.reduce(operators, operands)
+                if not merged:
+                    operators.append([op, 2])
+                expect_operand = True
+            else:
+                raise ValueError(f"expected connective before {token!r}")
+        if expect_operand:
+            raise ValueError("incomplete formula")
+        while operators:
+            if operators[-1][0] is None:
+                raise ValueError("unbalanced parentheses in formula")
+            self.reduce(operators, operands)
+        return operands[0]
+
+    def reduce(self, operators, operands):
+        """Applies the operator on top of the stack to its operands."""
+        op, arity = operators.pop()
+        node = self.node(op, operands[-arity:])
+        del operands[-arity:]
+        operands.append(node)
+
+    def load(self, path):
+        """
+        Parses a file holding one formula per line, skipping blank lines
+        and lines starting with #, and returns the list of their nodes.
+        """
+        nodes = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    nodes.append(self.parse(line))
+        return nodes
+
+    def formula(self, node):
+        """
+        Returns the formula of a node, exactly as Sentence.formula prints
+        the corresponding sentence.
+
+        The formula is written out piece by piece from a stack and joined
+        once, so no subformula's string is built or kept on its own.
+        """
+
+        # Find which formulas Sentence.parenthesize would leave as they
+        # are: only symbols can be, and one-operand And and Or print as
+        # their operand
+        bare = dict()
+        for current in self.cone([node]):
+            op = self.ops[current]
+            operands = self.children(current)
+            if op == Circuit.SYMBOL:
+                name = self.names[operands[0]]
+                bare[current] = Sentence.parenthesize(name) == name
+            elif op in (Circuit.AND, Circuit.OR) and len(operands) == 1:
+                bare[current] = bare[operands[0]]
+            else:
+                bare[current] = False
+
+        # Each stack entry is a string or a (node, parenthesize) pair
+        pieces = []
+        stack = [(node, False)]
+        while stack:
+            entry = stack.pop()
+            if isinstance(entry, str):
+                pieces.append(entry)
+                continue
+            current, parenthesize = entry
+            if parenthesize and not bare[current]:
+                stack.extend((")", (current, False), "("))
+                continue
+            op = self.ops[current]
+            operands = self.children(current)
+            if op == Circuit.SYMBOL:
+                pieces.append(self.names[operands[0]])
+            elif op == Circuit.NOT:
+                stack.extend(((operands[0], True), "¬"))
+            elif op in (Circuit.AND, Circuit.OR):
+                if not operands:
+                    pieces.append("⊤" if op == Circuit.AND else "⊥")
+                elif len(operands) == 1:
+                    stack.append((operands[0], False))
+                else:
+                    separator = " ∧ " if op == Circuit.AND else " ∨  "
+                    for i in range(len(operands) - 1, -1, -1):
+                        stack.append((operands[i], True))
+                        if i:
+                            stack.append(separator)
+            else:
+                connective = (" => " if op == Circuit.IMPLICATION
+                              else " <=> ")
+                stack.extend(((operands[1], True), connective,
+                              (operands[0], True)))
+        return "".join(pieces)
+
+    def sentence(self, node):
+        """Returns the logical sentence of a node."""
+        sentences = dict()
+        classes = {Circuit.NOT: Not, Circuit.AND: And, Circuit.OR: Or,
+                   Circuit.IMPLICATION: Implication,
+                   Circuit.BICONDITIONAL: Biconditional}
+        for current in self.cone([node]):
+            op = self.ops[current]
+            operands = self.children(current)
+            if op == Circuit.SYMBOL:
+                sentences[current] = Symbol(self.names[operands[0]])
+            else:
+                sentences[current] = classes[op](
+                    *[sentences[operand] for operand in operands]
+                )
+        return sentences[node]
+
+    def symbols(self, roots):
+        """Returns the set of symbol names the given nodes depend on."""
+        return {self.names[self.children(node)[0]]
+                for node in self.cone(roots)
+                if self.ops[node] == Circuit.SYMBOL}
+
+    def cone(self, roots):
+        """Returns the sorted list of nodes that the given nodes depend on."""
+        seen = set(roots)
+        stack = list(roots)
+        while stack:
+            node = stack.pop()
+            if self.ops[node] == Circuit.SYMBOL:
+                continue
+            for operand in self.children(node):
+                if operand not in seen:
+                    seen.add(operand)
+                    stack.append(operand)
+        return sorted(seen)
+
+    def symbol_masks(self):
+        """
+        Returns the truth table of every symbol over all 2^n models.
+
+        Model k assigns True to symbol i exactly when bit i of k is set, so
+        the table of symbol i is blocks of 2^i zeros then 2^i ones.
+        """
+        n = len(self.names)
+        if len(self.masks) != n:
+            size = 1 << n
+            self.masks = []
+            for i in range(n):
+                mask = ((1 << (1 << i)) - 1) << (1 << i)
+                length = 1 << (i + 1)
+                while length < size:
+                    mask |= mask << length
+                    length <<= 1
+                self.masks.append(mask)
+        return self.masks
+
+    def truth_tables(self, roots):
+        """
+        Returns the truth tables of the given nodes, one integer each, with
+        bit k set when the node is true in model k (see symbol_masks).
+
+        Every operation is a single integer operation covering all models
+        at once; tables of intermediate nodes are dropped after last use.
+        """
+        masks = self.symbol_masks()
+        full = (1 << (1 << len(self.names))) - 1
+        nodes = self.cone(roots)
+
+        # Find the last node reading each table, keeping roots until the end
+        last_use = dict()
+        for node in nodes:
+            if self.ops[node] != Circuit.SYMBOL:
+                for operand in self.children(node):
+                    last_use[operand] = node
+        for root in roots:
+            last_use[root] = len(self.ops)
+
+        tables = dict()
+        for node in nodes:
+            op = self.ops[node]
+            operands = self.children(node)
+            if op == Circuit.SYMBOL:
+                tables[node] = masks[operands[0]]
+                continue
+            if op == Circuit.NOT:
+                table = full ^ tables[operands[0]]
+            elif op == Circuit.AND:
+                table = full
+                for operand in operands:
+                    table &= tables[operand]
+            elif op == Circuit.OR:
+                table = 0
+                for operand in operands:
+                    table |= tables[operand]
+            elif op == Circuit.IMPLICATION:
+                table = (full ^ tables[operands[0]]) | tables[operands[1]]
+            else:
+                table = full ^ (tables[operands[0]] ^ tables[operands[1]])
+            tables[node] = table
+            for operand in operands:
+                if last_use.get(operand) == node:
+                    tables.pop(operand, None)
+        return [tables[root] for root in roots]
 
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
+    @classmethod
+    def literal(cls, node):
+        """Returns the SAT variable standing for a node."""
+        return node + 1
+
+    def tseitin(self, start=0):
+        """
+        Returns CNF clauses defining the SAT variable of every node from
+        start onwards as equivalent to the node's formula (Tseitin
+        encoding), so the clauses grow linearly with the circuit.
+
+        Clauses are lists of non-zero integers: literal v means the
+        variable v is true and -v that it is false.
+        """
+        clauses = []
+        for node in range(start, len(self.ops)):
+            op = self.ops[node]
+            if op == Circuit.SYMBOL:
+                continue
+            v = node + 1
+            operands = [operand + 1 for operand in self.children(node)]
+            if op == Circuit.NOT:
+                a = operands[0]
+                clauses.append([-v, -a])
+                clauses.append([v, a])
+            elif op == Circuit.AND:
+                for a in operands:
+                    clauses.append([-v, a])
+                clauses.append([v] + [-a for a in operands])
+            elif op == Circuit.OR:
+                for a in operands:
+                    clauses.append([v, -a])
+                clauses.append([-v] + operands)
+            elif op == Circuit.IMPLICATION:
+                a, b = operands
+                clauses.append([-v, -a, b])
+                clauses.append([v, a])
+                clauses.append([v, -b])
+            else:
+                a, b = operands
+                clauses.append([-v, -a, b])
+                clauses.append([-v, a, -b])
+                clauses.append([v, a, b])
+                clauses.append([v, -a, -b])
+        return clauses
+
+
+class SATSolver():
+    """
+    Conflict-driven clause learning (CDCL) SAT solver.
+
+    Clauses are watched by two literals each, conflicts are analysed to
+    the first unique implication point and learned as new clauses, and
+    branching prefers variables that took part in recent conflicts.
+    Clauses can be added between calls to solve, keeping what was learned.
+    """
+
+    def __init__(self):
+
+        # Per-variable state, indexed by variable (index 0 is unused)
+        self.assigns = [None]
+        self.level = [0]
+        self.reason = [None]
+        self.activity = [0.0]
+        self.phase = [False]
+
+        # Clauses watching each literal
+        self.watches = dict()
+        self.clauses = []
+        self.learnts = []
+
+        # Assigned literals in order, and where each decision level starts
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+
+        # Variables ordered by activity, stale entries are skipped
+        self.heap = []
+        self.increment = 1.0
+
+        # False once the clauses are known to be unsatisfiable
+        self.ok = True
+        self.model = None
+
+        self.decisions = 0
+        self.conflicts = 0
+        self.propagations = 0
+
+    def variables(self):
+        """Returns the number of variables in the solver."""
+        return len(self.assigns) - 1
+
+    def reserve(self, variable):
+        """Makes sure variables up to the given one exist."""
+        while len(self.assigns) <= variable:
+            v = len(self.assigns)
+            self.assigns.append(None)
+            self.level.append(0)
+            self.reason.append(None)
+            self.activity.append(0.0)
+            self.phase.append(False)
+            self.watches[v] = []
+            self.watches[-v] = []
+            heapq.heappush(self.heap, (0.0, v))
+
+    def value(self, literal):
+        """Returns the value of a literal, or None if it is unassigned."""
+        value = self.assigns[abs(literal)]
+        if value is None or literal > 0:
+            return value
+        return not value
+
+    def add_clause(self, literals):
+        """Adds a clause; returns False if the clauses became unsatisfiable."""
+        if not self.ok:
+            return False
+        self.backtrack(0)
+        clause = []
+        for literal in sorted(set(literals), key=abs):
+            self.reserve(abs(literal))
+            value = self.value(literal)
+            if value or -literal in clause:
+                return True
+            if value is None:
+                clause.append(literal)
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            self.ok = self.propagate() is None
         else:
+            self.watch(clause)
+            self.clauses.append(clause)
+        return self.ok
+
+    def add_clauses(self, clauses):
+        """Adds several clauses; returns False if they are unsatisfiable."""
+        for clause in clauses:
+            self.add_clause(clause)
+        return self.ok
+
+    def watch(self, clause):
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def assign(self, literal, reason):
+        v = abs(literal)
+        self.assigns[v] = literal > 0
+        self.level[v] = len(self.trail_lim)
+        self.reason[v] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns every literal implied by unit clauses, returning a
+        conflicting clause, or None if there is no conflict.
+        """
+        while self.qhead < len(self.trail):
+            false_literal = -self.trail[self.qhead]
+            self.qhead += 1
+            self.propagations += 1
+            watching = self.watches[false_literal]
+            kept = []
+            conflict = None
+            for index, clause in enumerate(watching):
+
+                # Make sure the false literal is the second watch
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], false_literal
+                first = clause[0]
+                if self.value(first):
+                    kept.append(clause)
+                    continue
+
+                # Look for another literal to watch
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], false_literal
+                        self.watches[clause[1]].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if self.value(first) is False:
+                        conflict = clause
+                        kept.extend(watching[index + 1:])
+                        break
+                    self.assign(first, clause)
+            self.watches[false_literal] = kept
+            if conflict is not None:
+                self.qhead = len(self.trail)
+                return conflict
+        return None
+
+    def analyze(self, conflict):
+        """
+        Derives a learned clause from a conflict, cutting at the first
+        unique implication point, and returns it with the decision level
+        to jump back to. The asserting literal comes first.
+        """
+        seen = set()
+        learnt = [None]
+        level = len(self.trail_lim)
+        pending = 0
+        index = len(self.trail) - 1
+        clause = conflict
+        literal = None
+        while True:
+            for q in (clause if literal is None else clause[1:]):
+                v = abs(q)
+                if v not in seen and self.level[v] > 0:
+                    seen.add(v)
+                    self.bump(v)
+                    if self.level[v] == level:
+                        pending += 1
+                    else:
+                        learnt.append(q)
+
+            # Walk back along the trail to the next literal involved
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            clause = self.reason[abs(literal)]
+            pending -= 1
+            if pending == 0:
+                break
+        learnt[0] = -literal
+
+        # Jump back to the second highest level, watching that literal
+        if len(learnt) == 1:
+            return learnt, 0
+        best = max(range(1, len(learnt)),
+                   key=lambda k: self.level[abs(learnt[k])])
+        learnt[1], learnt[best] = learnt[best], learnt[1]
+        return learnt, self.level[abs(learnt[1])]
+
+    def bump(self, v):
+        self.activity[v] += self.increment
+        if self.activity[v] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-self.activity[u], u)
+                         for u in range(1, len(self.assigns))
+                         if self.assigns[u] is None]
+            heapq.heapify(self.heap)
+        elif self.assigns[v] is None:
+            heapq.heappush(self.heap, (-self.activity[v], v))
+
+    def backtrack(self, level):
+        """Undoes every assignment made above the given decision level."""
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for literal in self.trail[start:]:
+            v = abs(literal)
+            self.phase[v] = self.assigns[v]
+            self.assigns[v] = None
+            self.reason[v] = None
+            heapq.heappush(self.heap, (-self.activity[v], v))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = start
+
+    def pick(self):
+        """Returns the unassigned variable with the highest activity."""
+        while self.heap:
+            activity, v = heapq.heappop(self.heap)
+            if self.assigns[v] is None and -activity == self.activity[v]:
+                return v
+        for v in range(1, len(self.assigns)):
+            if self.assigns[v] is None:
+                return v
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses are satisfiable with every assumption
+        literal true, storing a satisfying assignment in self.model, and
+        False otherwise.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        for literal in assumptions:
+            self.reserve(abs(literal))
+        self.backtrack(0)
+        restarts = 0
+        budget = 100 * luby(restarts)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                budget -= 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+                learnt, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learnt) == 1:
+                    self.assign(learnt[0], None)
+                else:
+                    self.watch(learnt)
+                    self.learnts.append(learnt)
+                    self.assign(learnt[0], learnt)
+                self.increment *= 1 / 0.95
+                continue
+
+            # Restart from the assumptions once the conflict budget is spent
+            if budget <= 0:
+                restarts += 1
+                budget = 100 * luby(restarts)
+                self.backtrack(0)
+                continue
+
+            # Assume the next assumption, or branch on the best variable
+            literal = None
+            while len(self.trail_lim) < len(assumptions):
+                assumption = assumptions[len(self.trail_lim)]
+                value = self.value(assumption)
+                if value is False:
+                    self.backtrack(0)
+                    return False
+                self.trail_lim.append(len(self.trail))
+                if value is None:
+                    literal = assumption
+                    break
+            if literal is None:
+                v = self.pick()
+                if v is None:
+                    self.model = {
+                        v: self.assigns[v] for v in range(1, len(self.assigns))
+                    }
+                    self.backtrack(0)
+                    return True
+                self.decisions += 1
+                literal = v if self.phase[v] else -v
+                self.trail_lim.append(len(self.trail))
+            self.assign(literal, None)
+
+
+def luby(i):
+    """Returns the i-th term (from 0) of the Luby restart sequence."""
+    size, power = 1, 0
+    while size < i + 1:
+        power += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) // 2
+        power -= 1
+        i = i % size
+    return 1 << power
+
+
+# Largest number of symbols for which truth tables are computed in full
+COMPILED_MAX_SYMBOLS = 22
+
+
+class KnowledgeBase():
+    """
+    Collection of sentences that answers many entailment queries.
+
+    Sentences are compiled into one circuit as they are added. The set of
+    models satisfying every sentence (as a truth table) or the SAT solver
+    holding their clauses, along with everything it has learned, is kept
+    between queries and only extended with what is new.
+    """
+
+    def __init__(self, *sentences, engine=None):
+        if engine not in (None, "compiled", "sat"):
+            raise ValueError(f"unknown engine {engine}")
+        self.engine = engine
+        self.sentences = []
+        self.names = set()
+
+        # Circuit holding every sentence and query, and the sentence roots
+        self.circuit = Circuit()
+        self.roots = []
+
+        # Truth table of the conjunction of the first table_roots sentences
+        # over the first table_symbols symbols
+        self.table = None
+        self.table_symbols = 0
+        self.table_roots = 0
+
+        # SAT solver, with the number of nodes encoded and roots asserted
+        self.solver = None
+        self.encoded = 0
+        self.asserted = 0
+
+        for sentence in sentences:
+            self.add(sentence)
+
+    def add(self, sentence):
+        """Adds a sentence to the knowledge base."""
+        self.roots.append(self.circuit.add(sentence))
+        self.sentences.append(sentence)
+        self.names.update(sentence.symbols())
+
+    def load(self, path):
+        """
+        Adds every formula in a file, one per line (see Circuit.load),
+        parsing them straight into the circuit without building sentences.
+        """
+        roots = self.circuit.load(path)
+        self.roots.extend(roots)
+        self.names.update(self.circuit.symbols(roots))
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
+    def symbols(self):
+        """Returns a set of all symbols in the knowledge base."""
+        return set(self.names)
+
+    def entails(self, query):
+        """Checks if the knowledge base entails query."""
+        return self.entails_all([query])[0]
+
+    def entails_all(self, queries):
+        """
+        Checks if the knowledge base entails each query, returning a list
+        of booleans. Queries are compiled together and answered against
+        the same models, so a batch costs little more than one query.
+        Queries may be sentences or formulas to parse.
+        """
+        nodes = [self.circuit.parse(query) if isinstance(query, str)
+                 else self.circuit.add(query) for query in queries]
+        engine = self.engine
+        if engine is None:
+            if len(self.circuit.names) <= COMPILED_MAX_SYMBOLS:
+                engine = "compiled"
+            else:
+                engine = "sat"
+        if engine == "compiled":
+            models = self.models()
+            tables = self.circuit.truth_tables(nodes)
+            return [models & ~table == 0 for table in tables]
+        solver = self.sat()
+        return [not solver.solve([-Circuit.literal(node)]) for node in nodes]
+
+    def models(self):
+        """
+        Returns the truth table of the knowledge base over every symbol in
+        the circuit, with one bit per model as in Circuit.truth_tables.
+        """
+        if self.table is None:
+            self.table = 1
+
+        # Models of new symbols repeat the table for each of their values
+        while self.table_symbols < len(self.circuit.names):
+            self.table |= self.table << (1 << self.table_symbols)
+            self.table_symbols += 1
+
+        roots = self.roots[self.table_roots:]
+        if roots:
+            for table in self.circuit.truth_tables(roots):
+                self.table &= table
+            self.table_roots = len(self.roots)
+        return self.table
+
+    def sat(self):
+        """Returns the SAT solver, with every sentence asserted."""
+        if self.solver is None:
+            self.solver = SATSolver()
+        self.solver.add_clauses(self.circuit.tseitin(self.encoded))
+        self.encoded = len(self.circuit)
+        for root in self.roots[self.asserted:]:
+            self.solver.add_clause([Circuit.literal(root)])
+        self.asserted = len(self.roots)
+        return self.solver
+
+
+def model_check(knowledge, query, engine=None, stats=None):
+    """
+    Checks if knowledge base entails query.
+
+    engine names one of the algorithms in ENGINES. By default, the compiled
+    truth-table engine is used whenever there are at most
+    COMPILED_MAX_SYMBOLS symbols, and the SAT solver otherwise.
+
+    If stats is a dict, the engine records how much work it did in it,
+    including the number of nodes it explored under "nodes".
+    """
+    if engine is None:
+        symbols = set().union(knowledge.symbols(), query.symbols())
+        if len(symbols) <= COMPILED_MAX_SYMBOLS:
+            engine = "compiled"
+        else:
+            engine = "sat"
+    try:
+        check = ENGINES[engine]
+    except KeyError:
+        raise ValueError(f"unknown engine {engine}")
+    return check(knowledge, query, stats)
+
+
+def model_check_compiled(knowledge, query, stats=None):
+    """
+    Checks if knowledge base entails query by computing the truth tables of
+    both over every model at once: entailment holds when no model makes the
+    knowledge true and the query false.
+    """
+    kb = KnowledgeBase(knowledge, engine="compiled")
+    entailed = kb.entails(query)
+    if stats is not None:
+        stats["nodes"] = len(kb.circuit)
+    return entailed
+
+
+def model_check_sat(knowledge, query, stats=None):
+    """
+    Checks if knowledge base entails query by asking a SAT solver whether
+    the knowledge together with the negated query is unsatisfiable.
+    """
+    kb = KnowledgeBase(knowledge, engine="sat")
+    entailed = kb.entails(query)
+    if stats is not None:
+        stats["nodes"] = kb.solver.decisions
+        stats["conflicts"] = kb.solver.conflicts
+        stats["propagations"] = kb.solver.propagations
+    return entailed
+
+
+def model_check_enumerate(knowledge, query, stats=None):
+    """
+    Checks if knowledge base entails query by visiting every model.
+
+    Knowledge and query are evaluated under each partial model, so a branch
+    is abandoned as soon as the knowledge is false or the query true.
+    """
 
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
+    # Get all symbols in both knowledge and query
+    symbols = sorted(set().union(knowledge.symbols(), query.symbols()))
 
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
+    # Check that knowledge entails query
+    checker = ModelChecker(knowledge, query, symbols)
+    entailed = checker.check_all(dict())
+    if stats is not None:
+        stats["nodes"] = checker.nodes
+    return entailed
+
+
+class ModelChecker():
+    """
+    Depth-first search over partial models for a counter-model: a model in
+    which the knowledge base is true and the query false.
+    """
+
+    def __init__(self, knowledge, query, symbols, stop=None):
+        self.knowledge = knowledge
+        self.query = query
+        self.symbols = symbols
+        self.nodes = 0
+
+        # Event that, once set, makes the search give up
+        self.stop = stop
+        self.stopped = False
+
+    def check_all(self, model):
+        """Checks if knowledge base entails query, given a partial model."""
+        self.nodes += 1
+
+        # Give up if another search already found a counter-model
+        if self.stop is not None and self.nodes % 1024 == 0:
+            self.stopped = self.stopped or self.stop.is_set()
+        if self.stopped:
+            return True
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+        # If knowledge base is false in every completion, nothing to check
+        known = self.knowledge.evaluate_partial(model)
+        if known is False:
+            return True
 
-    # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+        # If query is true in every completion, entailment holds here
+        answer = self.query.evaluate_partial(model)
+        if answer is True:
+            return True
 
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+        # If both are decided, knowledge is true and query false
+        if known is True and answer is False:
+            return False
+
+        # Choose the next unassigned symbol
+        p = self.symbols[len(model)]
+
+        # Ensure entailment holds with the symbol true and false
+        model[p] = True
+        entailed = self.check_all(model)
+        if entailed:
+            model[p] = False
+            entailed = self.check_all(model)
+        del model[p]
+        return entailed
+
+
+def model_check_parallel(knowledge, query, stats=None, processes=None,
+                         split=None):
+    """
+    Checks if knowledge base entails query by splitting the models on the
+    values of the first split symbols and searching each of the resulting
+    sub-cubes with ModelChecker in a pool of processes. Every worker stops
+    as soon as one of them finds a counter-model.
+
+    By default, there is a process per CPU and about four sub-cubes per
+    process. If stats is a dict, the nodes explored by each worker process
+    are recorded under "workers", keyed by process id.
+    """
+    symbols = sorted(set().union(knowledge.symbols(), query.symbols()))
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if split is None:
+        split = (4 * processes - 1).bit_length()
+    split = min(split, len(symbols))
+    cubes = itertools.product((True, False), repeat=split)
+
+    entailed = True
+    workers = dict()
+    stop = multiprocessing.Event()
+    with multiprocessing.Pool(
+        processes, initializer=parallel_worker,
+        initargs=(knowledge, query, symbols, stop)
+    ) as pool:
+        for pid, nodes, result in pool.imap_unordered(parallel_check, cubes):
+            workers[pid] = workers.get(pid, 0) + nodes
+            if not result:
+                entailed = False
+                stop.set()
+                break
+
+    if stats is not None:
+        stats["nodes"] = sum(workers.values())
+        stats["workers"] = workers
+    return entailed
+
+
+# Search state of a parallel_check worker process
+parallel_state = None
+
+
+def parallel_worker(knowledge, query, symbols, stop):
+    """Initializes a worker process of model_check_parallel."""
+    global parallel_state
+    parallel_state = (knowledge, query, symbols, stop)
+
+
+def parallel_check(cube):
+    """
+    Searches the models starting with the given values of the first
+    symbols, returning the process id, nodes explored and whether
+    entailment holds in the sub-cube.
+    """
+    knowledge, query, symbols, stop = parallel_state
+    checker = ModelChecker(knowledge, query, symbols, stop)
+    entailed = True
+    if not stop.is_set():
+        entailed = checker.check_all(dict(zip(symbols, cube)))
+    return os.getpid(), checker.nodes, entailed
+
+
+# Entailment algorithms available to model_check, by name
+ENGINES = {
+    "enumerate": model_check_enumerate,
+    "compiled": model_check_compiled,
+    "sat": model_check_sat,
+    "parallel": model_check_parallel,
+}
+
+
+def satisfying_models(sentence, symbols=None):
+    """
+    Yields every model in which sentence is true, as a dict mapping each
+    symbol name to a value. Models cover the given symbol names, by
+    default the symbols of the sentence.
+
+    Symbols are assigned one at a time and the sentence is conditioned on
+    each partial model, so branches are abandoned as soon as it is false,
+    and once it is true the remaining symbols are enumerated freely.
+    """
+    names = sorted(sentence.symbols() if symbols is None else symbols)
+
+    def extend(residual, index, model):
+        if residual is False:
+            return
+        if residual is True:
+            free = names[index:]
+            for values in itertools.product((True, False), repeat=len(free)):
+                complete = model.copy()
+                complete.update(zip(free, values))
+                yield complete
+            return
+        if index == len(names):
+            raise ValueError("symbols must include those of the sentence")
+        name = names[index]
+        for value in (True, False):
+            model[name] = value
+            yield from extend(residual.condition({name: value}), index + 1,
+                              model)
+        del model[name]
+
+    yield from extend(sentence.condition(dict()), 0, dict())
+
+
+def count_models(sentence, symbols=None):
+    """
+    Returns the number of models in which sentence is true, over the given
+    symbol names, by default the symbols of the sentence.
+
+    Conjunctions are split into components sharing no symbols, which are
+    counted separately and multiplied; otherwise the sentence is split on
+    one symbol. Counts of repeated subproblems are cached.
+    """
+    names = set(sentence.symbols() if symbols is None else symbols)
+    cache = dict()
+
+    def count(residual):
+        """Counts models of a sentence over its own symbols."""
+        if residual in cache:
+            return cache[residual]
+        symbols = residual.symbols()
+        total = 0
+        groups = []
+        if isinstance(residual, And):
+            groups = components(residual.conjuncts)
+        if len(groups) > 1:
+            total = 1
+            for group in groups:
+                part = group[0] if len(group) == 1 else And(*group)
+                total *= count(part)
+        else:
+            name = min(symbols)
+            for value in (True, False):
+                rest = residual.condition({name: value})
+                if rest is True:
+                    total += 1 << (len(symbols) - 1)
+                elif rest is not False:
+                    free = len(symbols) - 1 - len(rest.symbols())
+                    total += count(rest) << free
+        cache[residual] = total
+        return total
+
+    with interning():
+        residual = intern(sentence).condition(dict())
+        if isinstance(residual, bool):
+            return (1 << len(names)) if residual else 0
+        free = names - residual.symbols()
+        if len(free) != len(names) - len(residual.symbols()):
+            raise ValueError("symbols must include those of the sentence")
+        return count(residual) << len(free)
+
+
+def components(sentences):
+    """
+    Splits sentences into groups such that no two groups share a symbol,
+    returning a list of lists of sentences.
+    """
+    groups = []
+    for sentence in sentences:
+        symbols = set(sentence.symbols())
+        merged = [sentence]
+        separate = []
+        for group_symbols, group in groups:
+            if group_symbols & symbols:
+                symbols |= group_symbols
+                merged.extend(group)
+            else:
+                separate.append((group_symbols, group))
+        separate.append((symbols, merged))
+        groups = separate
+    return [group for _, group in groups]
+
+
+def node_count(sentence):
+    """Returns the number of nodes in a sentence, counting repeats."""
+    count = 0
+    stack = [sentence]
+    while stack:
+        current = stack.pop()
+        count += 1
+        if not isinstance(current, Symbol):
+            stack.extend(Circuit.operation(current)[1])
+    return count
+
+
+def simplify(sentence, stats=None):
+    """
+    Returns an equivalent, usually smaller, sentence: constants are folded
+    (the empty And is true and the empty Or false), nested conjunctions
+    and disjunctions are flattened, repeated operands are removed, double
+    negations cancel, and tautologies such as Implication(A, A) or a
+    conjunction containing both A and Not(A) become constants.
+
+    The result is interned. If stats is a dict, the node counts before
+    and after simplification are recorded under "before" and "after".
+    """
+    with interning():
+        simplified = simplify_node(intern(sentence), dict())
+    if stats is not None:
+        stats["before"] = node_count(sentence)
+        stats["after"] = node_count(simplified)
+    return simplified
+
+
+def simplify_node(sentence, simplified):
+    """Simplifies an interned sentence, caching results by sentence."""
+    if sentence in simplified:
+        return simplified[sentence]
+    if isinstance(sentence, Symbol):
+        result = sentence
+    elif isinstance(sentence, Not):
+        result = negate(simplify_node(sentence.operand, simplified))
+    elif isinstance(sentence, (And, Or)):
+        result = simplify_junction(
+            type(sentence),
+            [simplify_node(operand, simplified)
+             for operand in Circuit.operation(sentence)[1]]
+        )
+    elif isinstance(sentence, Implication):
+        antecedent = simplify_node(sentence.antecedent, simplified)
+        consequent = simplify_node(sentence.consequent, simplified)
+        result = simplify_junction(Or, [negate(antecedent), consequent])
+        if not is_constant(result):
+            result = Implication(antecedent, consequent)
+    else:
+        left = simplify_node(sentence.left, simplified)
+        right = simplify_node(sentence.right, simplified)
+        if left == right:
+            result = And()
+        elif left == negate(right):
+            result = Or()
+        elif is_constant(left):
+            result = right if left == And() else negate(right)
+        elif is_constant(right):
+            result = left if right == And() else negate(left)
+        else:
+            result = Biconditional(left, right)
+    simplified[sentence] = result
+    return result
+
+
+def simplify_junction(kind, operands):
+    """
+    Simplifies a conjunction (kind And) or disjunction (kind Or) of
+    simplified operands.
+    """
+    identity, absorbing = kind(), (Or() if kind is And else And())
+    flat = dict()
+    stack = list(reversed(operands))
+    while stack:
+        operand = stack.pop()
+        if isinstance(operand, kind):
+            stack.extend(reversed(Circuit.operation(operand)[1]))
+        elif operand == absorbing:
+            return absorbing
+        elif operand != identity:
+            flat[operand] = True
+    for operand in flat:
+        if negate(operand) in flat:
+            return absorbing
+    if len(flat) == 1:
+        return next(iter(flat))
+    return kind(*flat)
+
+
+def negate(sentence):
+    """Returns the negation of a simplified sentence, cancelling Not."""
+    if isinstance(sentence, Not):
+        return sentence.operand
+    if sentence == And():
+        return Or()
+    if sentence == Or():
+        return And()
+    return Not(sentence)
+
+
+def is_constant(sentence):
+    """Checks if a sentence is the empty And (true) or empty Or (false)."""
+    return sentence == And() or sentence == Or()
+
+
+def to_nnf(sentence):
+    """
+    Returns an equivalent sentence in negation normal form: only And, Or
+    and Not, with Not applied to symbols only.
+    """
+
+    def convert(sentence, positive):
+        if isinstance(sentence, Symbol):
+            return sentence if positive else Not(sentence)
+        if isinstance(sentence, Not):
+            return convert(sentence.operand, not positive)
+        if isinstance(sentence, (And, Or)):
+            kind = type(sentence)
+            if not positive:
+                kind = Or if kind is And else And
+            return kind(*[convert(operand, positive)
+                          for operand in Circuit.operation(sentence)[1]])
+        if isinstance(sentence, Implication):
+            return convert(Or(Not(sentence.antecedent), sentence.consequent),
+                           positive)
+        left, right = sentence.left, sentence.right
+        if positive:
+            return And(convert(Or(Not(left), right), True),
+                       convert(Or(left, Not(right)), True))
+        return Or(convert(And(left, Not(right)), True),
+                  convert(And(Not(left), right), True))
+
+    return simplify(convert(sentence, True))
+
+
+def to_cnf(sentence):
+    """
+    Returns an equivalent sentence in conjunctive normal form: an And of
+    Ors of symbols and negated symbols, without tautological or repeated
+    clauses. The result can be exponentially larger than the sentence;
+    Circuit.tseitin gives a linear, satisfiability-preserving encoding.
+    """
+    return And(*[Or(*clause) for clause in normal_form(sentence, And)])
+
+
+def to_dnf(sentence):
+    """
+    Returns an equivalent sentence in disjunctive normal form: an Or of
+    Ands of symbols and negated symbols, without contradictory or repeated
+    terms. The result can be exponentially larger than the sentence.
+    """
+    return Or(*[And(*term) for term in normal_form(sentence, Or)])
+
+
+def normal_form(sentence, outer):
+    """
+    Returns the clauses (outer And) or terms (outer Or) of a sentence as
+    lists of literals, with outer the operation joining them.
+    """
+    inner = Or if outer is And else And
+
+    def groups(nnf):
+        """Returns a dict whose keys are the groups of literals, as tuples."""
+        if isinstance(nnf, outer):
+            result = dict()
+            for operand in Circuit.operation(nnf)[1]:
+                result.update(groups(operand))
+            return result
+        if isinstance(nnf, inner):
+            result = {(): True}
+            for operand in Circuit.operation(nnf)[1]:
+                combined = dict()
+                rights = groups(operand)
+                for left in result:
+                    for right in rights:
+                        group = tuple(dict.fromkeys(left + right))
+                        if not any(negate(literal) in group
+                                   for literal in group):
+                            combined[group] = True
+                result = combined
+            return result
+        return {(nnf,): True}
+
+    # Collapse groups that only differ in the order of their literals
+    unique = dict()
+    for group in groups(to_nnf(sentence)):
+        unique.setdefault(frozenset(group), list(group))
+    return list(unique.values())
+
+
+def parse(text):
+    """Returns the logical sentence of a formula (see Circuit.parse)."""
+    circuit = Circuit()
+    return circuit.sentence(circuit.parse(text))
@@ -97,8 +97,9 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("Not yet implemented.")
         else:
-            for symbol in symbols:
-                if model_check(knowledge, symbol):
+            kb = KnowledgeBase(knowledge)
+            for symbol, entailed in zip(symbols, kb.entails_all(symbols)):
+                if entailed:
                     print(f"    {symbol}")
 
 
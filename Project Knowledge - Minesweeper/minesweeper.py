@@ -1,6 +1,11 @@
 import itertools
+import math
 import random
 import copy
+import heapq
+
+from collections import deque
+from functools import lru_cache
 
 
 
@@ -17,20 +22,22 @@ class Minesweeper():
         self.mines = set()
 
         # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
+        self.board = [[False] * width for i in range(height)]
+
+        # Number of mines around each cell, not including the cell itself
+        self.counts = [[0] * width for i in range(height)]
+
+        # Add mines randomly, choosing all their positions at once
+        for index in random.sample(range(height * width), mines):
+            i, j = divmod(index, width)
+            self.mines.add((i, j))
+            self.board[i][j] = True
 
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+            # Count the mine for each neighbouring cell
+            for row in self.counts[max(i - 1, 0):i + 2]:
+                for column in range(max(j - 1, 0), min(j + 2, width)):
+                    row[column] += 1
+            self.counts[i][j] -= 1
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -61,23 +68,28 @@ class Minesweeper():
         not including the cell itself.
         """
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
+        i, j = cell
+        return self.counts[i][j]
 
-        return count
+    def reveal(self, cell, revealed=()):
+        """
+        Reveals a safe cell, and if no mines are near it, its neighbours,
+        continuing through the whole region of cells with no nearby mines.
+        Cells in revealed are neither revealed again nor spread from.
+        Returns a dict mapping each cell revealed to its nearby mines.
+        """
+        counts = {cell: self.nearby_mines(cell)}
+        queue = deque([cell])
+        while queue:
+            i, j = queue.popleft()
+            if counts[(i, j)] != 0:
+                continue
+            for x in range(max(i - 1, 0), min(i + 2, self.height)):
+                for y in range(max(j - 1, 0), min(j + 2, self.width)):
+                    if (x, y) not in counts and (x, y) not in revealed:
+                        counts[(x, y)] = self.counts[x][y]
+                        queue.append((x, y))
+        return counts
 
     def won(self):
         """
@@ -86,6 +98,66 @@ class Minesweeper():
         return self.mines_found == self.mines
 
 
+class BitGrid():
+    """
+    Numbering of the cells of a board as bits of an integer.
+
+    Cell (i, j) is bit i * width + j, so a set of cells is an integer
+    and set operations are single integer operations. Small sets of
+    nearby cells are kept shifted down by an offset, so their integers
+    stay a few machine words long even on large boards.
+    """
+
+    def __init__(self, height, width):
+        self.height = height
+        self.width = width
+
+        # Neighbours of each cell, by bit index, as a mask shifted down by
+        # the matching offset
+        self.offsets = []
+        self.neighbours = []
+        for i in range(height):
+            for j in range(width):
+                offset = max((i - 1) * width + j - 1, 0)
+                mask = 0
+                for row in range(max(i - 1, 0), min(i + 2, height)):
+                    for column in range(max(j - 1, 0), min(j + 2, width)):
+                        if (row, column) != (i, j):
+                            mask |= 1 << (row * width + column - offset)
+                self.offsets.append(offset)
+                self.neighbours.append(mask)
+
+    def index(self, cell):
+        """Returns the bit index of a cell."""
+        return cell[0] * self.width + cell[1]
+
+    def bit(self, cell):
+        """Returns the mask with only a cell's bit set."""
+        return 1 << (cell[0] * self.width + cell[1])
+
+    def mask(self, cells):
+        """Returns the mask of a set of cells."""
+        mask = 0
+        for cell in cells:
+            mask |= 1 << (cell[0] * self.width + cell[1])
+        return mask
+
+    def cells(self, mask, offset=0):
+        """Returns the set of cells in a mask shifted down by offset."""
+        cells = set()
+        while mask:
+            low = mask & -mask
+            cells.add(divmod(offset + low.bit_length() - 1, self.width))
+            mask ^= low
+        return cells
+
+
+@lru_cache(maxsize=None)
+def bit_grid(height, width):
+    """Returns the shared BitGrid for boards of a given size."""
+    return BitGrid(height, width)
+
+
 class Sentence():
     """
     Logical statement about a Minesweeper game
@@ -103,6 +175,13 @@ class Sentence():
     def __str__(self):
         return f"{self.cells} = {self.count}"
 
+    def key(self):
+        """
+        Returns a hashable snapshot of the sentence, equal for equal
+        sentences.
+        """
+        return (frozenset(self.cells), self.count)
+
     def known_mines(self):
         """
         Returns the set of all cells in self.cells known to be mines.
@@ -120,6 +199,16 @@ class Sentence():
         if self.count == 0:
             return self.cells
 
+    def subtract_from(self, other):
+        """
+        If the cells of this sentence are a proper subset of the cells
+        of the other sentence, returns the sentence that follows about
+        the other sentence's remaining cells. Otherwise returns None.
+        """
+        if self.cells < other.cells:
+            return Sentence(other.cells - self.cells, other.count - self.count)
+        return None
+
     def mark_mine(self, cell):
         """
         Updates internal knowledge representation given the fact that
@@ -142,17 +231,319 @@ class Sentence():
             self.cells.remove(cell)
 
 
+class BitSentence():
+    """
+    Sentence whose cells are stored as a mask of a BitGrid, shifted down
+    so that its lowest cell is bit 0 (offset is that cell's index).
+
+    Behaves like Sentence, but takes a fraction of the memory, and
+    subset tests and differences are single integer operations.
+    """
+
+    __slots__ = ("mask", "offset", "count", "grid")
+
+    def __init__(self, cells, count, grid, offset=0):
+        self.mask = cells if isinstance(cells, int) else grid.mask(cells)
+        self.offset = offset
+        self.count = count
+        self.grid = grid
+        self.normalize()
+
+    def normalize(self):
+        """Shifts the mask so that its lowest set bit is bit 0."""
+        if self.mask == 0:
+            self.offset = 0
+        else:
+            shift = (self.mask & -self.mask).bit_length() - 1
+            self.mask >>= shift
+            self.offset += shift
+
+    @property
+    def cells(self):
+        return self.grid.cells(self.mask, self.offset)
+
+    def __eq__(self, other):
+        return self.key() == other.key()
+
+    def __str__(self):
+        return f"{self.cells} = {self.count}"
+
+    def key(self):
+        """
+        Returns a hashable snapshot of the sentence, equal for equal
+        sentences.
+        """
+        return (self.offset, self.mask, self.count)
+
+    def known_mines(self):
+        """
+        Returns the set of all cells in self.cells known to be mines.
+        """
+        if self.mask.bit_count() == self.count:
+            return self.cells
+
+    def known_safes(self):
+        """
+        Returns the set of all cells in self.cells known to be safe.
+        """
+        if self.count == 0:
+            return self.cells
+
+    def subtract_from(self, other):
+        """
+        If the cells of this sentence are a proper subset of the cells
+        of the other sentence, returns the sentence that follows about
+        the other sentence's remaining cells. Otherwise returns None.
+        """
+
+        # A subset cannot start below the other sentence's lowest cell
+        if self.offset < other.offset and self.mask:
+            return None
+        mask = self.mask << max(self.offset - other.offset, 0)
+        if mask & ~other.mask == 0 and mask != other.mask:
+            return BitSentence(other.mask & ~mask, other.count - self.count,
+                               self.grid, other.offset)
+        return None
+
+    def mark_mine(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be a mine.
+        """
+        index = self.grid.index(cell) - self.offset
+        if index >= 0 and self.mask >> index & 1:
+            self.mask ^= 1 << index
+            self.count -= 1
+            self.normalize()
+
+    def mark_safe(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be safe.
+        """
+        index = self.grid.index(cell) - self.offset
+        if index >= 0 and self.mask >> index & 1:
+            self.mask ^= 1 << index
+            self.normalize()
+
+
+class KnowledgeBase():
+    """
+    Set of sentences about a Minesweeper game, indexed by cell.
+
+    Sentences are stored under their key, so duplicates are never kept,
+    and every cell maps to the keys of the sentences containing it, so
+    marking a cell as a mine or as safe only touches those sentences.
+    Sentences left without cells are dropped.
+
+    Every sentence added or changed is queued in self.pending until the
+    AI has drawn its conclusions from it.
+    """
+
+    def __init__(self):
+
+        # Maps the key of each sentence to the sentence
+        self.sentences = dict()
+
+        # Maps each cell to the keys of the sentences that contain it
+        self.index = dict()
+
+        # Sentences added or changed since they were last looked at
+        self.pending = deque()
+
+    def __iter__(self):
+        return iter(list(self.sentences.values()))
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def __contains__(self, sentence):
+        return sentence.key() in self.sentences
+
+    def add(self, sentence):
+        """
+        Adds a sentence to the knowledge base, unless it has no cells or
+        is already known. Returns True if the sentence was added.
+        """
+        key = sentence.key()
+        cells = sentence.cells
+        if not cells or key in self.sentences:
+            return False
+        self.sentences[key] = sentence
+        for cell in cells:
+            self.index.setdefault(cell, set()).add(key)
+        self.pending.append(sentence)
+        return True
+
+    def current(self, sentence):
+        """Checks if a sentence is in the knowledge base, unchanged."""
+        return self.sentences.get(sentence.key()) is sentence
+
+    def remove(self, sentence):
+        """Removes a sentence from the knowledge base."""
+        key = sentence.key()
+        del self.sentences[key]
+        for cell in sentence.cells:
+            keys = self.index[cell]
+            keys.discard(key)
+            if not keys:
+                del self.index[cell]
+
+    def containing(self, cell):
+        """Returns the list of sentences that contain a cell."""
+        return [self.sentences[key] for key in self.index.get(cell, ())]
+
+    def overlapping(self, sentence):
+        """Returns the other sentences sharing a cell with a sentence."""
+        keys = set()
+        for cell in sentence.cells:
+            keys.update(self.index.get(cell, ()))
+        keys.discard(sentence.key())
+        return [self.sentences[key] for key in keys]
+
+    def components(self):
+        """
+        Splits the sentences into groups that share no cells, returning
+        a list of lists of sentences.
+        """
+        groups = []
+        seen = set()
+        for key in self.sentences:
+            if key in seen:
+                continue
+
+            # Collect every sentence reachable through shared cells
+            seen.add(key)
+            group = []
+            stack = [key]
+            while stack:
+                sentence = self.sentences[stack.pop()]
+                group.append(sentence)
+                for cell in sentence.cells:
+                    for other in self.index[cell]:
+                        if other not in seen:
+                            seen.add(other)
+                            stack.append(other)
+            groups.append(group)
+        return groups
+
+    def mark_mine(self, cell):
+        """Updates the sentences containing a cell known to be a mine."""
+        for sentence in self.containing(cell):
+            self.remove(sentence)
+            sentence.mark_mine(cell)
+            self.add(sentence)
+
+    def mark_safe(self, cell):
+        """Updates the sentences containing a cell known to be safe."""
+        for sentence in self.containing(cell):
+            self.remove(sentence)
+            sentence.mark_safe(cell)
+            self.add(sentence)
+
+
+def solve_equations(equations):
+    """
+    Given equations as pairs of a set of cells and the number of them
+    that are mines, returns the sets of cells that the equations force
+    to be mines and to be safe.
+    """
+
+    # Each row maps cells to integer coefficients, with the total under
+    # None; rows are scaled instead of divided, to avoid fractions
+    rows = []
+    for cells, count in equations:
+        row = dict.fromkeys(cells, 1)
+        row[None] = count
+        rows.append(row)
+
+    # Reduce to row echelon form, pivoting on the sparsest rows first
+    reduced = []
+    rows.sort(key=len)
+    while rows:
+        row = rows.pop(0)
+        pivot = min((cell for cell in row if cell is not None), default=None)
+        if pivot is None:
+            continue
+        scale = row[pivot]
+        for other in reduced + rows:
+            factor = other.get(pivot)
+            if factor is None:
+                continue
+            for cell in other:
+                other[cell] *= scale
+            for cell, value in row.items():
+                other[cell] = other.get(cell, 0) - factor * value
+                if other[cell] == 0 and cell is not None:
+                    del other[cell]
+            divisor = math.gcd(*other.values())
+            if divisor > 1:
+                for cell in other:
+                    other[cell] //= divisor
+        reduced.append(row)
+
+    # A cell is decided if its other value puts the total out of reach
+    mines = set()
+    safes = set()
+    for row in reduced:
+        total = row.pop(None, 0)
+        lowest = sum(value for value in row.values() if value < 0)
+        highest = sum(value for value in row.values() if value > 0)
+        for cell, value in row.items():
+            if value > 0 and lowest + value > total:
+                safes.add(cell)
+            elif value > 0 and highest - value < total:
+                mines.add(cell)
+            elif value < 0 and lowest - value > total:
+                mines.add(cell)
+            elif value < 0 and highest + value < total:
+                safes.add(cell)
+    return mines, safes
+
+
+# Largest number of cells in a component whose mines are enumerated
+PROBABILITY_MAX_CELLS = 48
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, bitboard=False, mines=None,
+                 guess="random", inference="subsets", order="fifo"):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
+        # Number of mines on the board, if known
+        self.total_mines = mines
+
+        # How to move without a safe move: "random" picks any cell, and
+        # "probability" the cell least likely to be a mine
+        if guess not in ("random", "probability"):
+            raise ValueError(f"unknown guess mode {guess}")
+        self.guess = guess
+
+        # Mine counts of constraint components, by their sentence keys
+        self.solutions = dict()
+
+        # How to draw conclusions: "subsets" compares pairs of sentences,
+        # and "linear" also solves each component as a system of equations
+        if inference not in ("subsets", "linear"):
+            raise ValueError(f"unknown inference mode {inference}")
+        self.inference = inference
+
+        # Components whose equations decided nothing, by their sentence keys
+        self.undecided = set()
+
+        # With a bitboard, sentences are BitSentences, and known mines and
+        # safes are also kept as masks
+        self.grid = bit_grid(height, width) if bitboard else None
+        self.mine_mask = 0
+        self.safe_mask = 0
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
@@ -160,8 +551,16 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Safe cells not played yet, as a queue in the order they became
+        # known ("fifo") or as a heap of cells with the most undetermined
+        # neighbours first ("information"); played cells are skipped later
+        if order not in ("fifo", "information"):
+            raise ValueError(f"unknown order {order}")
+        self.order = order
+        self.safe_moves = deque() if order == "fifo" else []
+
+        # Sentences about the game known to be true
+        self.knowledge = KnowledgeBase()
 
     def mark_mine(self, cell):
         """
@@ -169,17 +568,34 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        if self.grid is not None:
+            self.mine_mask |= self.grid.bit(cell)
+        self.knowledge.mark_mine(cell)
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
+        if cell not in self.safes and cell not in self.moves_made:
+            if self.order == "fifo":
+                self.safe_moves.append(cell)
+            else:
+                priority = -self.undetermined(cell)
+                heapq.heappush(self.safe_moves, (priority, cell))
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        if self.grid is not None:
+            self.safe_mask |= self.grid.bit(cell)
+        self.knowledge.mark_safe(cell)
+
+    def undetermined(self, cell):
+        """Returns how many neighbours of a cell are not known yet."""
+        count = 0
+        for i in range(max(cell[0] - 1, 0), min(cell[0] + 2, self.height)):
+            for j in range(max(cell[1] - 1, 0), min(cell[1] + 2, self.width)):
+                if (i, j) not in self.safes and (i, j) not in self.mines:
+                    count += 1
+        return count
 
     def add_knowledge(self, cell, count):
         """
@@ -201,9 +617,47 @@ class MinesweeperAI():
         self.moves_made.add(cell)
 
         # 2) mark the cell as safe
-        self.safes.add(cell)
+        self.mark_safe(cell)
 
         # 3) add a new sentence to the AI's knowledge base, based on the value of `cell` and `count`
+        new_sentence = self.neighbour_sentence(cell, count)
+
+        # add to knowledge base, unless already known
+        self.knowledge.add(new_sentence)
+
+        # 4) and 5) draw conclusions from new and changed sentences
+        self.infer()
+
+    def add_knowledge_batch(self, observations):
+        """
+        Like add_knowledge, for a dict mapping many safe cells to their
+        number of nearby mines, such as those opened by Minesweeper.reveal.
+        All the cells are marked before their sentences are made, and
+        conclusions are drawn once, from all the sentences together.
+        """
+        for cell in observations:
+            self.moves_made.add(cell)
+            self.mark_safe(cell)
+        for cell, count in observations.items():
+            self.knowledge.add(self.neighbour_sentence(cell, count))
+        self.infer()
+
+    def neighbour_sentence(self, cell, count):
+        """
+        Returns the sentence saying that count of the neighbours of a
+        cell are mines, leaving out neighbours already known to be
+        mines or safe.
+        """
+
+        # With a bitboard, take the neighbour mask minus known cells
+        if self.grid is not None:
+            index = self.grid.index(cell)
+            offset = self.grid.offsets[index]
+            neighbours = self.grid.neighbours[index]
+            count -= (neighbours & self.mine_mask >> offset).bit_count()
+            known = (self.mine_mask | self.safe_mask) >> offset
+            return BitSentence(neighbours & ~known, count, self.grid, offset)
+
         cell_row = cell[0]
         cell_column = cell[1]
 
@@ -226,56 +680,124 @@ class MinesweeperAI():
                     new_sentense_set.add((i, j))
                     
         # create new sentence
-        new_sentence = Sentence(new_sentense_set, new_sentense_count)
-
-        # add to knowledge list
-        self.knowledge.append(new_sentence)
-
-        # 4) mark any additional cells as safe or as mines, if it can be concluded based on the AI's knowledge base
-        for sentense in self.knowledge:
-            # if cell in sentense.cells:
-            self.mark_safe(cell)
-            while True:
-                # check if other known mines / safe
-                known_mines = sentense.known_mines()
-                if known_mines is not None and len(known_mines) != 0:
-                    self.mines = self.mines.union(known_mines)
-                    for mine in copy.copy(known_mines):
-                        self.mark_mine(mine)
-                    continue
-                known_safes = sentense.known_safes()
-                if known_safes is not None and len(known_safes) != 0:
-                    self.safes = self.safes.union(known_safes)
-                    for safe in copy.copy(known_safes):
-                        self.mark_safe(safe)
-                    continue
-                break
-        
-        # 5) add any new sentences to the AI's knowledge base if they can be inferred from existing knowledge
-
-        while True:
-            count_new_sentense = 0
-            for sentense1 in self.knowledge:
-                for sentense2 in self.knowledge:
-                    if sentense1.cells < sentense2.cells:
-                        new_subset = sentense1.cells.intersection(sentense2.cells)
-                        if new_subset == sentense1.cells:
-                            break
-                        new_count = sentense2.count - sentense1.count
-                        new_sentense_by_inference = Sentence(new_subset, new_count)
-                        count_new_sentense += 1
-                        self.knowledge.append(new_sentense_by_inference)
-                    elif sentense2.cells < sentense1.cells:
-                        new_subset = sentense2.cells.intersection(sentense1.cells)
-                        if new_subset == sentense2.cells:
-                            break
-                        new_count = sentense1.count - sentense2.count
-                        new_sentense_by_inference = Sentence(new_subset, new_count)
-                        count_new_sentense += 1
-                        self.knowledge.append(new_sentense_by_inference)
-            if count_new_sentense == 0:
-                break
+        return Sentence(new_sentense_set, new_sentense_count)
 
+    def infer(self):
+        """
+        Works through the sentences added or changed since they were last
+        looked at, until none are left:
+            4) a sentence whose cells are all mines, or all safe,
+               marks them, which changes the sentences containing them
+            5) a sentence compared with each overlapping sentence may
+               give a new sentence, using the subset method
+        Marking and adding sentences queue them again, and only new
+        sentences are added, so the work list always runs out.
+        In "linear" inference mode, once it does, the sentences are solved
+        as equations, and any cells decided are marked and worked through.
+        """
+        pending = self.knowledge.pending
+        while pending or self.inference == "linear" and self.infer_linear():
+            sentence = pending.popleft()
+            if not self.knowledge.current(sentence):
+                continue
+
+            # 4) mark cells as safe or as mines if the sentence decides them
+            known_mines = sentence.known_mines()
+            if known_mines:
+                for mine in copy.copy(known_mines):
+                    self.mark_mine(mine)
+                continue
+            known_safes = sentence.known_safes()
+            if known_safes:
+                for safe in copy.copy(known_safes):
+                    self.mark_safe(safe)
+                continue
+
+            # 5) infer new sentences from overlapping ones
+            for other in self.knowledge.overlapping(sentence):
+                inferred = sentence.subtract_from(other)
+                if inferred is None:
+                    inferred = other.subtract_from(sentence)
+                if inferred is not None:
+                    self.knowledge.add(inferred)
+
+    def infer_linear(self):
+        """
+        Treats each component of the knowledge base as a system of linear
+        equations, one per sentence, over cells that are 0 (safe) or 1
+        (a mine). Gaussian elimination gives equations that each involve
+        few cells, and an equation decides a cell if giving that cell the
+        other value would put its sum out of reach of the rest.
+        Marks the decided cells, returning whether there were any.
+        """
+        decided = False
+        for group in self.knowledge.components():
+            key = frozenset(sentence.key() for sentence in group)
+            if len(group) < 2 or key in self.undecided:
+                continue
+            mines, safes = solve_equations(
+                [(sentence.cells, sentence.count) for sentence in group]
+            )
+            if not mines and not safes:
+                if len(self.undecided) > 10000:
+                    self.undecided.clear()
+                self.undecided.add(key)
+                continue
+            decided = True
+            for mine in mines:
+                self.mark_mine(mine)
+            for safe in safes:
+                self.mark_safe(safe)
+        return decided
+
+    def snapshot(self):
+        """
+        Returns the AI's knowledge as an immutable tuple, to be given to
+        restore later. Sentences are kept by their keys, so a snapshot
+        shares nothing with the AI and can be restored any number of times.
+        """
+        pending = tuple(sentence.key() for sentence in self.knowledge.pending
+                        if self.knowledge.current(sentence))
+        return (
+            frozenset(self.moves_made),
+            frozenset(self.mines),
+            frozenset(self.safes),
+            tuple(self.knowledge.sentences),
+            pending,
+            self.mine_mask,
+            self.safe_mask,
+            tuple(self.safe_moves),
+        )
+
+    def restore(self, snapshot):
+        """Returns the AI's knowledge to what it was at a snapshot."""
+        (moves_made, mines, safes, sentences, pending,
+         self.mine_mask, self.safe_mask, safe_moves) = snapshot
+        self.moves_made = set(moves_made)
+        self.mines = set(mines)
+        self.safes = set(safes)
+
+        # Rebuild the sentences from their keys
+        self.knowledge = KnowledgeBase()
+        for key in sentences:
+            self.knowledge.add(self.sentence(key))
+        self.knowledge.pending = deque(
+            self.knowledge.sentences[key] for key in pending
+        )
+
+        # A heap saved as a tuple is still in heap order
+        if self.order == "fifo":
+            self.safe_moves = deque(safe_moves)
+        else:
+            self.safe_moves = list(safe_moves)
+
+    def sentence(self, key):
+        """Returns a new sentence with the given key."""
+        if self.grid is not None:
+            offset, mask, count = key
+            return BitSentence(mask, count, self.grid, offset)
+        cells, count = key
+        return Sentence(cells, count)
 
     def make_safe_move(self):
         """
@@ -285,12 +807,18 @@ class MinesweeperAI():
 
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
+        Takes the first cell of the queue of safe moves, dropping cells
+        played since they were queued.
         """
+        queue = self.safe_moves
+        if self.order == "fifo":
+            while queue and queue[0] in self.moves_made:
+                queue.popleft()
+            return queue[0] if queue else None
 
-        safe_move_set = self.safes - self.moves_made
-        if len(safe_move_set) > 0:
-            return list(safe_move_set)[random.randrange(len(safe_move_set))]
-        return None
+        while queue and queue[0][1] in self.moves_made:
+            heapq.heappop(queue)
+        return queue[0][1] if queue else None
 
     def make_random_move(self):
         """
@@ -298,7 +826,10 @@ class MinesweeperAI():
         Should choose randomly among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+        In "probability" guess mode, chooses with make_probable_move.
         """
+        if self.guess == "probability":
+            return self.make_probable_move()
 
         # set of all possible move
         all_move = set()
@@ -309,3 +840,182 @@ class MinesweeperAI():
         if len(random_move) == 0:
             return None
         return list(random_move)[random.randrange(len(random_move))]
+
+    def make_probable_move(self):
+        """
+        Returns the cell, among those not chosen yet and not known to be
+        mines, that is least likely to be a mine (see mine_probabilities),
+        choosing randomly between equally likely cells. Returns None if
+        there is no such cell.
+        """
+        probabilities = self.mine_probabilities()
+        if not probabilities:
+            return None
+        lowest = min(probabilities.values())
+        cells = sorted(cell for cell, probability in probabilities.items()
+                       if probability == lowest)
+        return cells[random.randrange(len(cells))]
+
+    def mine_probabilities(self):
+        """
+        Returns the probability that each cell not chosen yet and not
+        known to be a mine is a mine, assuming every arrangement of mines
+        consistent with the knowledge base is equally likely.
+
+        Sentences are split into components sharing no cells, and the
+        mine arrangements of each component are enumerated separately
+        (and remembered while the component stays unchanged). If the
+        total number of mines is known, components are weighted by the
+        number of ways to place the remaining mines on the other cells.
+        Components too large to enumerate are estimated from the density
+        of their sentences.
+        """
+        unknown = set()
+        for i in range(self.height):
+            for j in range(self.width):
+                if (i, j) not in self.moves_made and (i, j) not in self.mines:
+                    unknown.add((i, j))
+        probabilities = {cell: 0.0 for cell in unknown & self.safes}
+        outside = unknown - self.safes
+
+        # Enumerate each component, or estimate it if it is too large
+        exact = []
+        estimated_mines = 0.0
+        for group in self.knowledge.components():
+            cells = set()
+            for sentence in group:
+                cells.update(sentence.cells)
+            outside -= cells
+            if len(cells) > PROBABILITY_MAX_CELLS:
+                for cell in cells:
+                    probabilities[cell] = max(
+                        sentence.count / len(sentence.cells)
+                        for sentence in group if cell in sentence.cells
+                    )
+                    estimated_mines += probabilities[cell]
+            else:
+                exact.append(self.component_solutions(group))
+
+        # Weight of each number of mines left for the cells outside
+        remaining = None
+        if self.total_mines is not None:
+            remaining = self.total_mines - len(self.mines) - round(
+                estimated_mines
+            )
+
+        def weight(mines):
+            if remaining is None:
+                return 1
+            if not 0 <= remaining - mines <= len(outside):
+                return 0
+            return math.comb(len(outside), remaining - mines)
+
+        def convolve(distributions):
+            total = {0: 1}
+            for distribution in distributions:
+                combined = dict()
+                for a, x in total.items():
+                    for b, y in distribution.items():
+                        combined[a + b] = combined.get(a + b, 0) + x * y
+                total = combined
+            return total
+
+        # Arrangements of all components by their total number of mines,
+        # falling back to ignoring the total if it contradicts them
+        ways = [{k: count for k, (count, _) in solutions[1].items()}
+                for solutions in exact]
+        everything = convolve(ways)
+        total = sum(count * weight(k) for k, count in everything.items())
+        if total == 0:
+            remaining = None
+            total = sum(everything.values())
+
+        for index, (cells, solutions) in enumerate(exact):
+            others = convolve(ways[:index] + ways[index + 1:])
+            mine_ways = [0] * len(cells)
+            for k, (_, per_cell) in solutions.items():
+                factor = sum(count * weight(k + m)
+                             for m, count in others.items())
+                for i, count in enumerate(per_cell):
+                    mine_ways[i] += count * factor
+            for cell, count in zip(cells, mine_ways):
+                probabilities[cell] = count / total
+
+        # Cells outside every sentence share the mines left over
+        if outside:
+            if remaining is None:
+                frontier = [p for p in probabilities.values() if p > 0]
+                density = sum(frontier) / len(frontier) if frontier else 0.5
+            else:
+                expected = sum(count * weight(k) * (remaining - k)
+                               for k, count in everything.items())
+                density = expected / total / len(outside)
+            for cell in outside:
+                probabilities[cell] = density
+        return probabilities
+
+    def component_solutions(self, sentences):
+        """
+        Enumerates the mine arrangements satisfying a group of sentences,
+        returning the list of their cells and a dict mapping each number
+        of mines to a pair: how many arrangements have that many mines,
+        and for each cell how many of those make it a mine.
+        """
+        key = frozenset(sentence.key() for sentence in sentences)
+        if key in self.solutions:
+            return self.solutions[key]
+
+        # Order cells so that each shares sentences with earlier ones
+        cells = []
+        constraints = dict()
+        for sentence in sentences:
+            for cell in sorted(sentence.cells):
+                if cell not in constraints:
+                    constraints[cell] = []
+                    cells.append(cell)
+        counts = [sentence.count for sentence in sentences]
+        unassigned = [len(sentence.cells) for sentence in sentences]
+        for index, sentence in enumerate(sentences):
+            for cell in sentence.cells:
+                constraints[cell].append(index)
+        order = [constraints[cell] for cell in cells]
+
+        solutions = dict()
+        chosen = []
+
+        def assign(position):
+            if position == len(cells):
+                entry = solutions.setdefault(
+                    len(chosen), [0, [0] * len(cells)]
+                )
+                entry[0] += 1
+                for i in chosen:
+                    entry[1][i] += 1
+                return
+            for mine in (0, 1):
+                feasible = all(
+                    mine <= counts[c] <= unassigned[c] - 1 + mine
+                    for c in order[position]
+                )
+                if not feasible:
+                    continue
+                for c in order[position]:
+                    counts[c] -= mine
+                    unassigned[c] -= 1
+                if mine:
+                    chosen.append(position)
+                assign(position + 1)
+                if mine:
+                    chosen.pop()
+                for c in order[position]:
+                    counts[c] += mine
+                    unassigned[c] += 1
+
+        assign(0)
+
+        # Forget old components once many have been remembered
+        if len(self.solutions) > 10000:
+            self.solutions.clear()
+        result = (cells, {k: tuple(v) for k, v in solutions.items()})
+        self.solutions[key] = result
+        return result
@@ -1,5 +1,7 @@
 import pygame
+import queue
 import sys
+import threading
 import time
 
 from minesweeper import Minesweeper, MinesweeperAI
@@ -37,9 +39,45 @@ flag = pygame.transform.scale(flag, (cell_size, cell_size))
 mine = pygame.image.load("assets/images/mine.png")
 mine = pygame.transform.scale(mine, (cell_size, cell_size))
 
+
+def think(tasks, results):
+    """
+    Runs the AI on a worker thread, so the display keeps updating while
+    it thinks. Each task is ("learn", ai, observations), passed on to
+    add_knowledge_batch, or ("move", ai), which chooses a move. Posts
+    ("learned", ai, seconds) or ("move", ai, move, safe, seconds) back.
+    """
+    while True:
+        task = tasks.get()
+        start = time.perf_counter()
+        if task[0] == "learn":
+            _, agent, observations = task
+            agent.add_knowledge_batch(observations)
+            results.put(("learned", agent, time.perf_counter() - start))
+        else:
+            _, agent = task
+            move = agent.make_safe_move()
+            safe = move is not None
+            if not safe:
+                move = agent.make_random_move()
+            seconds = time.perf_counter() - start
+            results.put(("move", agent, move, safe, seconds))
+
+
+# Start the AI worker
+tasks = queue.Queue()
+results = queue.Queue()
+threading.Thread(target=think, args=(tasks, results), daemon=True).start()
+clock = pygame.time.Clock()
+
 # Create game and AI agent
 game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES,
+                   guess="probability")
+
+# Whether the AI is choosing a move, and how long it last took to think
+thinking = False
+inference_time = None
 
 # Keep track of revealed cells, flagged cells, and if a mine was hit
 revealed = set()
@@ -51,10 +89,35 @@ instructions = True
 
 while True:
 
-    # Check if game quit
+    clock.tick(60)
+
+    # Check if game quit, and find any click as (button, position)
+    click = None
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             sys.exit()
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            click = (event.button, event.pos)
+
+    # Collect the AI's work, ignoring any from before a reset
+    moves = []
+    while not results.empty():
+        result = results.get()
+        if result[1] is not ai:
+            continue
+        inference_time = result[-1]
+        if result[0] == "move":
+            thinking = False
+            _, _, move, safe, _ = result
+            moves.append(move)
+            if move is None:
+                flags = ai.mines.copy()
+                print("No moves left to make.")
+            elif safe:
+                print("AI making safe move.")
+            else:
+                print("No known safe moves, AI guessing the cell least "
+                      "likely to be a mine.")
 
     screen.fill(BLACK)
 
@@ -88,12 +151,9 @@ while True:
         screen.blit(buttonText, buttonTextRect)
 
         # Check if play button clicked
-        click, _, _ = pygame.mouse.get_pressed()
-        if click == 1:
-            mouse = pygame.mouse.get_pos()
-            if buttonRect.collidepoint(mouse):
+        if click is not None and click[0] == 1:
+            if buttonRect.collidepoint(click[1]):
                 instructions = False
-                time.sleep(0.3)
 
         pygame.display.flip()
         continue
@@ -159,13 +219,21 @@ while True:
     textRect.center = ((5 / 6) * width, (2 / 3) * height)
     screen.blit(text, textRect)
 
-    move = None
-
-    left, _, right = pygame.mouse.get_pressed()
+    # Display how long the AI last took to think
+    if thinking:
+        text = "AI thinking..."
+    elif inference_time is not None:
+        text = f"Inference: {1000 * inference_time:.1f} ms"
+    else:
+        text = ""
+    text = smallFont.render(text, True, WHITE)
+    textRect = text.get_rect()
+    textRect.center = ((5 / 6) * width, (2 / 3) * height + 40)
+    screen.blit(text, textRect)
 
     # Check for a right-click to toggle flagging
-    if right == 1 and not lost:
-        mouse = pygame.mouse.get_pos()
+    if click is not None and click[0] == 3 and not lost:
+        mouse = click[1]
         for i in range(HEIGHT):
             for j in range(WIDTH):
                 if cells[i][j].collidepoint(mouse) and (i, j) not in revealed:
@@ -173,32 +241,26 @@ while True:
                         flags.remove((i, j))
                     else:
                         flags.add((i, j))
-                    time.sleep(0.2)
 
-    elif left == 1:
-        mouse = pygame.mouse.get_pos()
+    elif click is not None and click[0] == 1:
+        mouse = click[1]
 
-        # If AI button clicked, make an AI move
+        # If AI button clicked, ask the AI for a move
         if aiButton.collidepoint(mouse) and not lost:
-            move = ai.make_safe_move()
-            if move is None:
-                move = ai.make_random_move()
-                if move is None:
-                    flags = ai.mines.copy()
-                    print("No moves left to make.")
-                else:
-                    print("No known safe moves, AI making random move.")
-            else:
-                print("AI making safe move.")
-            time.sleep(0.2)
+            if not thinking:
+                thinking = True
+                tasks.put(("move", ai))
 
         # Reset game state
         elif resetButton.collidepoint(mouse):
             game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-            ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+            ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES,
+                               guess="probability")
             revealed = set()
             flags = set()
             lost = False
+            thinking = False
+            inference_time = None
             continue
 
         # User-made move
@@ -208,15 +270,21 @@ while True:
                     if (cells[i][j].collidepoint(mouse)
                             and (i, j) not in flags
                             and (i, j) not in revealed):
-                        move = (i, j)
+                        moves.append((i, j))
 
-    # Make move and update AI knowledge
-    if move:
+    # Make moves and update AI knowledge, skipping cells revealed since
+    # the AI chose them
+    for move in moves:
+        if move is None or move in revealed or lost:
+            continue
         if game.is_mine(move):
             lost = True
         else:
-            nearby = game.nearby_mines(move)
-            revealed.add(move)
-            ai.add_knowledge(move, nearby)
+
+            # Flagged cells stop the cascade, unless the AI chose one
+            flags.discard(move)
+            observations = game.reveal(move, revealed | flags)
+            revealed.update(observations)
+            tasks.put(("learn", ai, observations))
 
     pygame.display.flip()
@@ -0,0 +1,122 @@
+import multiprocessing
+import random
+import sys
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+USAGE = ("Usage: python simulate.py games [height] [width] [mines] "
+         "[option=value ...]")
+
+
+def main():
+    positional = [arg for arg in sys.argv[1:] if "=" not in arg]
+    if not 1 <= len(positional) <= 4:
+        sys.exit(USAGE)
+    try:
+        games, height, width, mines = (
+            [int(arg) for arg in positional] + [8, 8, 8][len(positional) - 1:]
+        )
+    except ValueError:
+        sys.exit(USAGE)
+
+    # Remaining arguments are passed on to the AI, e.g. guess=probability
+    options = dict(arg.split("=", 1) for arg in sys.argv[1:] if "=" in arg)
+    options = {name: option(value) for name, value in options.items()}
+
+    start = time.perf_counter()
+    results = simulate(games, height, width, mines, **options)
+    seconds = time.perf_counter() - start
+
+    print(f"Board: {height}x{width} with {mines} mines")
+    print(f"Games won: {results['wins']} of {games} "
+          f"({100 * results['wins'] / games:.1f}%)")
+    print(f"Moves: {results['moves']} "
+          f"({results['moves'] / seconds:.0f} per second)")
+    for name in ("add_knowledge_batch", "make_safe_move"):
+        calls, total, worst = results[name]
+        mean = 1000 * total / calls if calls else 0
+        print(f"{name}: {calls} calls, mean {mean:.3f} ms, "
+              f"max {1000 * worst:.3f} ms")
+
+
+def option(value):
+    """Converts an option given on the command line to a Python value."""
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return {"True": True, "False": False, "None": None}.get(value, value)
+
+
+def simulate(games, height=8, width=8, mines=8, processes=None, **options):
+    """
+    Plays the given number of games, seeded 0 to games - 1, across a
+    pool of processes. The AI is told the number of mines and given any
+    other options as keyword arguments. Returns the number of games won,
+    the number of moves made, and for add_knowledge_batch and
+    make_safe_move a tuple of the number of calls, total seconds and
+    slowest call.
+    """
+    tasks = [(seed, height, width, mines, options) for seed in range(games)]
+    with multiprocessing.Pool(processes) as pool:
+        played = pool.starmap(play, tasks, chunksize=max(1, games // 64))
+
+    results = {
+        "wins": 0,
+        "moves": 0,
+        "add_knowledge_batch": (0, 0.0, 0.0),
+        "make_safe_move": (0, 0.0, 0.0),
+    }
+    for game in played:
+        results["wins"] += game["won"]
+        results["moves"] += game["moves"]
+        for name in ("add_knowledge_batch", "make_safe_move"):
+            calls, total, worst = results[name]
+            times = game[name]
+            results[name] = (calls + len(times), total + sum(times),
+                             max([worst] + times))
+    return results
+
+
+def play(seed, height, width, mines, options):
+    """
+    Plays one game seeded with seed, returning whether the AI won, the
+    number of moves it made, and the seconds taken by each call to
+    add_knowledge_batch and make_safe_move. Each move reveals the whole
+    region of cells with no nearby mines around it.
+    """
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines)
+    ai = MinesweeperAI(height=height, width=width, mines=mines, **options)
+    result = {"won": False, "moves": 0,
+              "add_knowledge_batch": [], "make_safe_move": []}
+
+    while True:
+        start = time.perf_counter()
+        move = ai.make_safe_move()
+        result["make_safe_move"].append(time.perf_counter() - start)
+        if move is None:
+            move = ai.make_random_move()
+            if move is None:
+                break
+
+        if game.is_mine(move):
+            return result
+        result["moves"] += 1
+        observations = game.reveal(move, ai.moves_made)
+        start = time.perf_counter()
+        ai.add_knowledge_batch(observations)
+        result["add_knowledge_batch"].append(time.perf_counter() - start)
+
+        # The game is won once every safe cell has been revealed
+        if len(ai.moves_made) == height * width - mines:
+            result["won"] = True
+            return result
+
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+
+from graph import Graph
+
+# Identifies a cache file, and the version of its layout
+MAGIC = b"DEGREES1"
+
+# Sections of a cache file, in order, each an array of the given type
+# ("B" for UTF-8 text), preceded by a header of their offsets and sizes
+SECTIONS = [
+    ("person_offsets", "i"),
+    ("person_movies", "i"),
+    ("movie_offsets", "i"),
+    ("movie_stars", "i"),
+    ("person_id_offsets", "q"),
+    ("person_id_text", "B"),
+    ("name_offsets", "q"),
+    ("name_text", "B"),
+    ("birth_offsets", "q"),
+    ("birth_text", "B"),
+    ("movie_id_offsets", "q"),
+    ("movie_id_text", "B"),
+    ("title_offsets", "q"),
+    ("title_text", "B"),
+    ("year_offsets", "q"),
+    ("year_text", "B"),
+    ("people_by_id", "i"),
+    ("movies_by_id", "i"),
+    ("lower_name_offsets", "q"),
+    ("lower_name_text", "B"),
+    ("people_by_name", "i"),
+]
+
+
+def is_fresh(path, sources):
+    """Checks if a cache file exists and is newer than all its sources."""
+    try:
+        built = os.path.getmtime(path)
+        return all(os.path.getmtime(source) < built for source in sources)
+    except OSError:
+        return False
+
+
+def save(path, people, movies, graph):
+    """
+    Writes people, movies and their graph to a cache file, replacing the
+    file only once it is complete.
+    """
+    person_ids = graph.person_ids
+    movie_ids = graph.movie_ids
+    names = [people[id]["name"] for id in person_ids]
+    lower_names = sorted(
+        (name.lower(), i) for i, name in enumerate(names)
+    )
+
+    sections = dict(
+        person_offsets=graph.person_offsets,
+        person_movies=graph.person_movies,
+        movie_offsets=graph.movie_offsets,
+        movie_stars=graph.movie_stars,
+        people_by_id=array("i", sorted(range(len(person_ids)),
+                                       key=person_ids.__getitem__)),
+        movies_by_id=array("i", sorted(range(len(movie_ids)),
+                                       key=movie_ids.__getitem__)),
+        people_by_name=array("i", (i for _, i in lower_names)),
+    )
+    for name, strings in [
+        ("person_id", person_ids),
+        ("name", names),
+        ("birth", [people[id]["birth"] for id in person_ids]),
+        ("movie_id", movie_ids),
+        ("title", [movies[id]["title"] for id in movie_ids]),
+        ("year", [movies[id]["year"] for id in movie_ids]),
+        ("lower_name", [name for name, _ in lower_names]),
+    ]:
+        sections[f"{name}_offsets"], sections[f"{name}_text"] = (
+            encode(strings)
+        )
+
+    # Lay sections out after the header, each aligned to 8 bytes
+    header = struct.Struct(f"8s{2 * len(SECTIONS)}q")
+    layout = []
+    position = header.size
+    for name, typecode in SECTIONS:
+        size = len(sections[name]) * array(typecode).itemsize
+        layout.extend((position, size))
+        position += size + -size % 8
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(header.pack(MAGIC, *layout))
+        for name, typecode in SECTIONS:
+            data = sections[name]
+            if not isinstance(data, (array, bytes)):
+                data = array(typecode, data)
+            f.write(data)
+            f.write(bytes(-f.tell() % 8))
+    os.replace(temporary, path)
+
+
+def encode(strings):
+    """
+    Returns the UTF-8 text of a list of strings, joined together, and
+    the array of offsets where each one starts, followed by the total.
+    """
+    offsets = array("q", [0])
+    chunks = []
+    for string in strings:
+        chunk = string.encode("utf-8")
+        chunks.append(chunk)
+        offsets.append(offsets[-1] + len(chunk))
+    return offsets, b"".join(chunks)
+
+
+def load(path):
+    """
+    Maps a cache file into memory, returning names, people, movies and
+    the graph, which read from it as they are used. Processes mapping
+    the same file share its pages. Raises ValueError or struct.error if
+    the file is not a complete cache file.
+    """
+    with open(path, "rb") as f:
+        data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    header = struct.Struct(f"8s{2 * len(SECTIONS)}q")
+    magic, *layout = header.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a cache file")
+
+    sections = dict()
+    for (name, typecode), start, size in zip(
+        SECTIONS, layout[::2], layout[1::2]
+    ):
+        if (start < header.size or start + size > len(data)
+                or size % array(typecode).itemsize):
+            raise ValueError(f"{path} is damaged")
+        sections[name] = data[start:start + size].cast(typecode)
+
+    def strings(name):
+        return Strings(sections[f"{name}_offsets"], sections[f"{name}_text"])
+
+    person_ids = strings("person_id")
+    movie_ids = strings("movie_id")
+    person_index = Index(person_ids, sections["people_by_id"])
+    movie_index = Index(movie_ids, sections["movies_by_id"])
+
+    graph = Graph()
+    graph.person_ids = person_ids
+    graph.movie_ids = movie_ids
+    graph.person_index = person_index
+    graph.movie_index = movie_index
+    for name in ("person_offsets", "person_movies",
+                 "movie_offsets", "movie_stars"):
+        setattr(graph, name, sections[name])
+
+    names = Names(strings("lower_name"), sections["people_by_name"],
+                  person_ids)
+    people = Records(person_index,
+                     name=strings("name"), birth=strings("birth"))
+    movies = Records(movie_index,
+                     title=strings("title"), year=strings("year"))
+    return names, people, movies, graph
+
+
+class Strings():
+    """Read-only sequence of strings stored as text and offsets."""
+
+    def __init__(self, offsets, text):
+        self.offsets = offsets
+        self.text = text
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return str(self.text[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+class Sorted():
+    """View of a sequence in the order given by a list of its indexes."""
+
+    def __init__(self, items, order):
+        self.items = items
+        self.order = order
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        return self.items[self.order[i]]
+
+
+class Index(Mapping):
+    """Maps the ids in a sequence to their position, by binary search."""
+
+    def __init__(self, ids, order):
+        self.ids = ids
+        self.order = order
+        self.sorted = Sorted(ids, order)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.sorted[i] for i in range(len(self)))
+
+    def __getitem__(self, id):
+        i = bisect_left(self.sorted, id)
+        if i == len(self) or self.sorted[i] != id:
+            raise KeyError(id)
+        return self.order[i]
+
+
+class Records(Mapping):
+    """Maps ids to dictionaries of fields, built when looked up."""
+
+    def __init__(self, index, **fields):
+        self.index = index
+        self.fields = fields
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __getitem__(self, id):
+        i = self.index[id]
+        return {name: values[i] for name, values in self.fields.items()}
+
+
+class Names(Mapping):
+    """Maps lowercase names to the set of ids of the people named so."""
+
+    def __init__(self, names, order, ids):
+        self.names = names
+        self.order = order
+        self.ids = ids
+
+    def __len__(self):
+        return len(set(self))
+
+    def __iter__(self):
+        previous = None
+        for i in range(len(self.names)):
+            name = self.names[i]
+            if name != previous:
+                yield name
+            previous = name
+
+    def __getitem__(self, name):
+        start = bisect_left(self.names, name)
+        end = bisect_right(self.names, name, start)
+        if start == end:
+            raise KeyError(name)
+        return {self.ids[self.order[i]] for i in range(start, end)}
@@ -1,30 +1,53 @@
 import csv
+import struct
 import sys
 
+import cache
+from graph import Graph
 from util import Node, StackFrontier, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
 
-# Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
+# Maps person_ids to a dictionary of: name, birth
 people = {}
 
-# Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
+# Maps movie_ids to a dictionary of: title, year
 movies = {}
 
+# Which people starred in which movies
+graph = Graph()
+
+# Name of the binary copy of the data kept next to the CSV files
+CACHE = "degrees.cache"
+
 
 def load_data(directory):
     """
-    Load data from CSV files into memory.
+    Load data from CSV files into memory, or map it from the cache file
+    when that is newer than all of them. Loading the CSV files, also
+    done if the cache file is damaged, writes the cache, if the
+    directory allows it.
     """
+    global names, people, movies, graph
+    path = f"{directory}/{CACHE}"
+    sources = [f"{directory}/{name}.csv"
+               for name in ("people", "movies", "stars")]
+    if cache.is_fresh(path, sources):
+        try:
+            names, people, movies, graph = cache.load(path)
+            return
+        except (ValueError, struct.error):
+            pass
+    names, people, movies, graph = {}, {}, {}, Graph()
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
             people[row["id"]] = {
                 "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
+                "birth": row["birth"]
             }
             if row["name"].lower() not in names:
                 names[row["name"].lower()] = {row["id"]}
@@ -37,19 +60,20 @@ def load_data(directory):
         for row in reader:
             movies[row["id"]] = {
                 "title": row["title"],
-                "year": row["year"],
-                "stars": set()
+                "year": row["year"]
             }
 
-    # Load stars
+    # Load stars, ignoring unknown people and movies
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+        stars = [(row["person_id"], row["movie_id"]) for row in reader]
+    graph.build(people, movies, stars)
+
+    # Save the data for next time
+    try:
+        cache.save(path, people, movies, graph)
+    except OSError:
+        pass
 
 
 def main():
@@ -89,6 +113,84 @@ def shortest_path(source, target):
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    If no possible path, returns None.
+
+    Searches from both ends at once, each step expanding a whole layer
+    of whichever side has the smaller frontier, until the two meet.
+    The search works on the graph's numbers for people and movies, and
+    only the path found is turned back into ids.
+    """
+
+    # Exceptional case, same person
+    if source == target:
+        raise Exception("same person")
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+
+    # Map each person reached to the (movie, person) they were reached
+    # from, towards the source or towards the target
+    forward = {source: None}
+    backward = {target: None}
+    forward_layer = [source]
+    backward_layer = [target]
+
+    while forward_layer and backward_layer:
+
+        # Expand the smaller frontier
+        if len(forward_layer) <= len(backward_layer):
+            reached, other, layer = forward, backward, forward_layer
+        else:
+            reached, other, layer = backward, forward, backward_layer
+
+        next_layer = []
+        for person in layer:
+            for movie in graph.movies(person):
+                for neighbor in graph.stars(movie):
+                    if neighbor in reached:
+                        continue
+                    reached[neighbor] = (movie, person)
+
+                    # The first meeting gives a shortest path
+                    if neighbor in other:
+                        return join_paths(forward, backward, neighbor)
+                    next_layer.append(neighbor)
+
+        if reached is forward:
+            forward_layer = next_layer
+        else:
+            backward_layer = next_layer
+
+    return None
+
+
+def join_paths(forward, backward, middle):
+    """
+    Returns the list of (movie_id, person_id) pairs from the source to
+    the target through the person where the two searches met, given
+    the numbers of the people and movies each search came from.
+    """
+    path = []
+    person = middle
+    while forward[person] is not None:
+        movie, previous = forward[person]
+        path.append((movie, person))
+        person = previous
+    path.reverse()
+
+    person = middle
+    while backward[person] is not None:
+        movie, person = backward[person]
+        path.append((movie, person))
+    return [(graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in path]
+
+
+def breadth_first_search(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching only from
+    the source.
+
     If no possible path, returns None.
     """
 
@@ -180,12 +282,7 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
-    neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
-    return neighbors
+    return graph.neighbors(person_id)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+from array import array
+
+
+class Graph():
+    """
+    Co-star graph stored in compressed sparse row form.
+
+    People and movies are numbered densely from 0, in the order their
+    ids are given. The movies of person i are
+    person_movies[person_offsets[i]:person_offsets[i + 1]], and the
+    stars of movie j are movie_stars[movie_offsets[j]:movie_offsets[j + 1]],
+    all kept in compact integer arrays instead of sets of strings.
+    """
+
+    def __init__(self):
+        self.build([], [], [])
+
+    def build(self, person_ids, movie_ids, stars):
+        """
+        Builds the graph from lists of person and movie ids and a list of
+        (person_id, movie_id) pairs, ignoring pairs with unknown ids.
+        """
+        self.person_ids = list(person_ids)
+        self.movie_ids = list(movie_ids)
+        self.person_index = {id: i for i, id in enumerate(self.person_ids)}
+        self.movie_index = {id: i for i, id in enumerate(self.movie_ids)}
+
+        # Number the pairs, dropping duplicates and unknown ids
+        pairs = set()
+        for person_id, movie_id in stars:
+            person = self.person_index.get(person_id)
+            movie = self.movie_index.get(movie_id)
+            if person is not None and movie is not None:
+                pairs.add((person, movie))
+
+        self.person_offsets, self.person_movies = compress(
+            len(self.person_ids), sorted(pairs)
+        )
+        self.movie_offsets, self.movie_stars = compress(
+            len(self.movie_ids), sorted((m, p) for p, m in pairs)
+        )
+
+    def movies(self, person):
+        """Returns the numbers of the movies of the person numbered person."""
+        offsets = self.person_offsets
+        return self.person_movies[offsets[person]:offsets[person + 1]]
+
+    def stars(self, movie):
+        """Returns the numbers of the stars of the movie numbered movie."""
+        offsets = self.movie_offsets
+        return self.movie_stars[offsets[movie]:offsets[movie + 1]]
+
+    def neighbors(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        neighbors = set()
+        for movie in self.movies(self.person_index[person_id]):
+            movie_id = self.movie_ids[movie]
+            for person in self.stars(movie):
+                neighbors.add((movie_id, self.person_ids[person]))
+        return neighbors
+
+
+def compress(rows, pairs):
+    """
+    Given the number of rows and a sorted list of (row, column) pairs,
+    returns the array of offsets where each row starts, followed by the
+    total, and the array of columns.
+    """
+    offsets = array("i", bytes(4 * (rows + 1)))
+    columns = array("i", (column for _, column in pairs))
+    for row, _ in pairs:
+        offsets[row + 1] += 1
+    for row in range(rows):
+        offsets[row + 1] += offsets[row]
+    return offsets, columns